@@ -0,0 +1,701 @@
+"""
+Marketplace Analytics for Discord Marketplace Bot
+Running aggregates over the marketplace data. MarketplaceStats subscribes to
+the data store and updates its counters as orders, tickets and scripts
+change, so the analytics views read them in constant time. recompute()
+rebuilds the same numbers from the raw collections to check them.
+Rollups keeps hourly and daily sales buckets in the store's 'rollups'
+collection, so reports over any window never scan the order history.
+Unique buyers per bucket are HyperLogLog sketches, merged across buckets.
+OrderColumns holds the order history as NumPy arrays for the Deep Analytics
+report; it is only available when NumPy is installed. VerificationTracker
+measures how long payments take to verify and which tickets have waited
+longest. SalesCounters counts how often each script is ordered and which
+scripts are bought together.
+"""
+
+import asyncio
+import base64
+import hashlib
+import heapq
+import math
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import zlib
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:
+    np = None
+    HAVE_NUMPY = False
+
+
+def to_timestamp(value):
+    """Epoch seconds from a stored timestamp; older records hold ISO strings"""
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value).timestamp())
+    return value or 0
+
+
+def to_cents(amount):
+    """Money is summed in integer cents so running totals never drift"""
+    return int(round((amount or 0) * 100))
+
+
+class MarketplaceStats:
+    """Order, ticket and catalog totals kept current from store change events"""
+
+    def __init__(self, store):
+        self.store = store
+        self.order_count = 0
+        self.revenue_cents = 0
+        self.ticket_count = 0
+        self.tickets_by_status = {}
+        self.script_count = 0
+        self.price_total_cents = 0
+        self._top_script = None
+        store.subscribe(self.on_change)
+
+    @property
+    def revenue(self):
+        return self.revenue_cents / 100
+
+    @property
+    def avg_order_value(self):
+        return self.revenue_cents / self.order_count / 100 if self.order_count else 0
+
+    @property
+    def catalog_value(self):
+        return self.price_total_cents / 100
+
+    @property
+    def avg_price(self):
+        return self.price_total_cents / self.script_count / 100 if self.script_count else 0
+
+    @property
+    def most_expensive(self):
+        """Highest priced script, found again only after it changes or is removed"""
+        if self._top_script is None and self.script_count:
+            self._top_script = max(self.store.get('scripts'), key=lambda s: s['price'])
+        return self._top_script
+
+    def tickets_with_status(self, status):
+        return self.tickets_by_status.get(status, 0)
+
+    def on_change(self, name, event, record, old):
+        handler = getattr(self, f"_on_{name}", None)
+        if handler is None:
+            return
+        if event == 'load':
+            self._reset(name)
+            for record in self.store.get(name):
+                handler('append', record, None)
+        else:
+            handler(event, record, old)
+
+    def _reset(self, name):
+        if name == 'orders':
+            self.order_count = self.revenue_cents = 0
+        elif name == 'tickets':
+            self.ticket_count = 0
+            self.tickets_by_status = {}
+        elif name == 'scripts':
+            self.script_count = self.price_total_cents = 0
+            self._top_script = None
+
+    def _on_orders(self, event, order, old):
+        if event == 'append':
+            self.order_count += 1
+            self.revenue_cents += to_cents(order.get('total_price'))
+        elif event == 'delete':
+            self.order_count -= 1
+            self.revenue_cents -= to_cents(order.get('total_price'))
+        elif 'total_price' in old:
+            self.revenue_cents += to_cents(order.get('total_price')) - to_cents(old['total_price'])
+
+    def _on_tickets(self, event, ticket, old):
+        if event == 'append':
+            self.ticket_count += 1
+            self._count_status(ticket.get('status'), 1)
+        elif event == 'delete':
+            self.ticket_count -= 1
+            self._count_status(ticket.get('status'), -1)
+        elif 'status' in old:
+            self._count_status(old['status'], -1)
+            self._count_status(ticket.get('status'), 1)
+
+    def _count_status(self, status, delta):
+        self.tickets_by_status[status] = self.tickets_by_status.get(status, 0) + delta
+
+    def _on_scripts(self, event, script, old):
+        if event == 'append':
+            self.script_count += 1
+            self.price_total_cents += to_cents(script['price'])
+            if self._top_script is not None and script['price'] > self._top_script['price']:
+                self._top_script = script
+        elif event == 'delete':
+            self.script_count -= 1
+            self.price_total_cents -= to_cents(script['price'])
+            if script is self._top_script:
+                self._top_script = None
+        elif 'price' in old:
+            self.price_total_cents += to_cents(script['price']) - to_cents(old['price'])
+            if script is self._top_script or (self._top_script is not None
+                                              and script['price'] > self._top_script['price']):
+                self._top_script = None
+
+    def totals(self):
+        """The running totals, in the same shape as recompute()"""
+        top = self.most_expensive
+        return {
+            'order_count': self.order_count,
+            'revenue_cents': self.revenue_cents,
+            'ticket_count': self.ticket_count,
+            'tickets_by_status': {k: v for k, v in self.tickets_by_status.items() if v},
+            'script_count': self.script_count,
+            'price_total_cents': self.price_total_cents,
+            'top_price_cents': to_cents(top['price']) if top else None,
+        }
+
+    def recompute(self):
+        """Compute the totals from scratch over the current collections"""
+        orders = self.store.get('orders')
+        tickets = self.store.get('tickets')
+        scripts = self.store.get('scripts')
+        tickets_by_status = {}
+        for ticket in tickets:
+            tickets_by_status[ticket.get('status')] = tickets_by_status.get(ticket.get('status'), 0) + 1
+        return {
+            'order_count': len(orders),
+            'revenue_cents': sum(to_cents(order.get('total_price')) for order in orders),
+            'ticket_count': len(tickets),
+            'tickets_by_status': tickets_by_status,
+            'script_count': len(scripts),
+            'price_total_cents': sum(to_cents(script['price']) for script in scripts),
+            'top_price_cents': max((to_cents(script['price']) for script in scripts), default=None),
+        }
+
+    def verify(self):
+        """Names of the running totals that disagree with a full recompute"""
+        running = self.totals()
+        expected = self.recompute()
+        return [key for key in expected if running[key] != expected[key]]
+
+
+class HyperLogLog:
+    """Approximate distinct counter: 2^precision one-byte registers.
+
+    With the default 1024 registers the count is within about 3% and two
+    sketches merge by taking the larger register, so any window of buckets
+    can be combined without keeping the IDs themselves.
+    """
+
+    def __init__(self, precision=10, registers=None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+
+    def add(self, value):
+        index, rank = _register_of(value, self.precision)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            # Linear counting is more accurate while most registers are empty
+            estimate = self.size * math.log(self.size / zeros)
+        return round(estimate)
+
+    def encode(self):
+        """Compact string form for the rollups document"""
+        return base64.b64encode(zlib.compress(bytes(self.registers))).decode()
+
+    @classmethod
+    def decode(cls, text):
+        registers = zlib.decompress(base64.b64decode(text)) if text else None
+        return cls(registers=registers)
+
+
+@lru_cache(maxsize=65536)
+def _register_of(value, precision):
+    """Register index and rank for a value; buyers repeat, so this is cached"""
+    digest = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+    rest = digest & ((1 << (64 - precision)) - 1)
+    return digest >> (64 - precision), 64 - precision - rest.bit_length() + 1
+
+
+def day_key(timestamp):
+    return _bucket_keys(int(timestamp) // 900)[0]
+
+
+def hour_key(timestamp):
+    return _bucket_keys(int(timestamp) // 900)[1]
+
+
+@lru_cache(maxsize=4096)
+def _bucket_keys(quarter):
+    """Local day and hour keys; UTC offsets and DST switches fall on quarter hours"""
+    moment = datetime.fromtimestamp(quarter * 900)
+    return moment.strftime('%Y-%m-%d'), moment.strftime('%Y-%m-%dT%H')
+
+
+class Rollups:
+    """Hourly and daily totals of orders, revenue, unique buyers and verifications.
+
+    The buckets are updated as orders are placed and tickets verified, and
+    written with the rest of the data. The document also records how many
+    orders and verified tickets it covers; if that stops matching the data
+    (first run, cleared data, hand edits, older layout) it is rebuilt from
+    scratch.
+    """
+
+    # Bumped whenever the bucket layout changes
+    VERSION = 2
+
+    def __init__(self, store, hourly_retention_days=7):
+        self.store = store
+        self.hourly_retention_days = hourly_retention_days
+        store.subscribe(self.on_change)
+
+    def on_change(self, name, event, record, old):
+        if name == 'orders' and event == 'append':
+            self._add_order(self.store.get('rollups'), record)
+            self.store.touch('rollups')
+        elif name == 'tickets' and event == 'update' and 'status' in old \
+                and record.get('status') == 'verified':
+            self._add_verification(self.store.get('rollups'), record)
+            self.store.touch('rollups')
+        elif name in ('orders', 'tickets', 'rollups') and event in ('load', 'delete') \
+                or name == 'tickets' and event == 'update' and old.get('status') == 'verified':
+            # Verifications are only ever added, so a ticket leaving 'verified'
+            # (a rolled back transaction) goes through the count check too
+            self.check()
+
+    def check(self):
+        """Rebuild the rollups if they don't cover exactly the current data"""
+        doc = self.store.get('rollups')
+        if doc.get('version') != self.VERSION or \
+                doc.get('order_count', 0) != len(self.store.get('orders')) or \
+                doc.get('verified_count', 0) != self.store.count_by('tickets', 'status', 'verified'):
+            self.rebuild()
+
+    def rebuild(self):
+        doc = self.store.get('rollups')
+        doc.clear()
+        doc['version'] = self.VERSION
+        # Sketches stay decoded until the end, so a rebuild stays linear
+        sketches = {}
+        for order in self.store.get('orders'):
+            self._add_order(doc, order, prune=False, sketches=sketches)
+        for ticket in self.store.find_by('tickets', 'status', 'verified'):
+            self._add_verification(doc, ticket, prune=False, sketches=sketches)
+        for (_, field), (bucket, sketch) in sketches.items():
+            bucket[field] = sketch.encode()
+        self._prune(doc)
+        self.store.touch('rollups')
+
+    def _buckets(self, doc, timestamp, prune=True):
+        daily = doc.setdefault('daily', {})
+        hourly = doc.setdefault('hourly', {})
+        day, hour = _bucket_keys(int(timestamp) // 900)
+        if hour not in hourly and prune:
+            self._prune(doc)
+        return [_bucket(daily, day), _bucket(hourly, hour)]
+
+    def _prune(self, doc):
+        """Drop hourly buckets older than the retention period"""
+        hourly = doc.get('hourly', {})
+        cutoff = hour_key((datetime.now() - timedelta(days=self.hourly_retention_days)).timestamp())
+        for key in [key for key in hourly if key < cutoff]:
+            del hourly[key]
+
+    def _add_order(self, doc, order, prune=True, sketches=None):
+        doc.setdefault('version', self.VERSION)
+        doc['order_count'] = doc.get('order_count', 0) + 1
+        for bucket in self._buckets(doc, to_timestamp(order.get('created_at')), prune):
+            bucket['orders'] += 1
+            bucket['revenue_cents'] += to_cents(order.get('total_price'))
+            _count_distinct(bucket, 'buyers', order.get('buyer_id'), sketches)
+
+    def _add_verification(self, doc, ticket, prune=True, sketches=None):
+        doc.setdefault('version', self.VERSION)
+        doc['verified_count'] = doc.get('verified_count', 0) + 1
+        verified_at = ticket.get('verified_at') or ticket.get('created_at')
+        for bucket in self._buckets(doc, to_timestamp(verified_at), prune):
+            bucket['verified'] += 1
+            _count_distinct(bucket, 'verified_buyers', ticket.get('user_id'), sketches)
+
+    def days(self, start, end):
+        """Totals for the days from start to end, inclusive (dates)"""
+        daily = self.store.get('rollups').get('daily', {})
+        keys = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+        return _combine(daily.get(key) for key in keys)
+
+    def last_days(self, days):
+        """Totals for today and the days before it"""
+        today = date.today()
+        return self.days(today - timedelta(days=days - 1), today)
+
+    def last_hours(self, hours):
+        """Totals for the current hour and the hours before it"""
+        hourly = self.store.get('rollups').get('hourly', {})
+        now = datetime.now().timestamp()
+        return _combine(hourly.get(hour_key(now - i * 3600)) for i in range(hours))
+
+
+def _bucket(buckets, key):
+    if key not in buckets:
+        buckets[key] = {'orders': 0, 'revenue_cents': 0, 'buyers': '', 'verified': 0, 'verified_buyers': ''}
+    return buckets[key]
+
+
+def _count_distinct(bucket, field, value, sketches=None):
+    """Add value to a bucket's sketch; with sketches, defer re-encoding it"""
+    if sketches is None:
+        sketch = HyperLogLog.decode(bucket[field])
+        sketch.add(value)
+        bucket[field] = sketch.encode()
+        return
+    key = (id(bucket), field)
+    if key not in sketches:
+        sketches[key] = (bucket, HyperLogLog.decode(bucket[field]))
+    sketches[key][1].add(value)
+
+
+def _combine(buckets):
+    totals = {'orders': 0, 'revenue_cents': 0, 'verified': 0}
+    buyers = HyperLogLog()
+    verified_buyers = HyperLogLog()
+    for bucket in buckets:
+        if bucket:
+            totals['orders'] += bucket['orders']
+            totals['revenue_cents'] += bucket['revenue_cents']
+            totals['verified'] += bucket['verified']
+            buyers.merge(HyperLogLog.decode(bucket['buyers']))
+            verified_buyers.merge(HyperLogLog.decode(bucket['verified_buyers']))
+    totals['revenue'] = totals['revenue_cents'] / 100
+    totals['buyers'] = buyers.count()
+    totals['verified_buyers'] = verified_buyers.count()
+    return totals
+
+
+class LatencyHistogram:
+    """Streaming histogram over fixed log-scale buckets.
+
+    Bucket 0 holds values under 1 second and bucket k >= 1 holds values in
+    [2^((k-1)/8), 2^(k/8)) seconds. percentile() reports a bucket's upper
+    edge 2^(k/8), so it is within about 9% of the exact value whatever the
+    number of samples.
+    """
+
+    STEPS_PER_DOUBLING = 8
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+
+    def _bucket(self, value):
+        if value < 1:
+            return 0
+        return int(math.log2(value) * self.STEPS_PER_DOUBLING) + 1
+
+    def add(self, value, count=1):
+        bucket = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.total += count
+
+    def remove(self, value):
+        self.add(value, -1)
+
+    def percentile(self, pct):
+        """Upper edge of the bucket holding the pct-th percentile (None if empty)"""
+        if self.total <= 0:
+            return None
+        rank = math.ceil(self.total * pct / 100)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return 2 ** (bucket / self.STEPS_PER_DOUBLING)
+        return None
+
+    def share_below(self, value):
+        """Fraction of samples in buckets entirely below value"""
+        if self.total <= 0:
+            return None
+        limit = self._bucket(value)
+        return sum(count for bucket, count in self.counts.items() if bucket < limit) / self.total
+
+
+class VerificationTracker:
+    """Verification latency histogram plus a heap of pending tickets by age.
+
+    Both are built from the tickets on load and then kept current from store
+    events. Verified or removed tickets are dropped from the heap lazily,
+    when they reach the top.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.latency = LatencyHistogram()
+        self._pending = []
+        store.subscribe(self.on_change)
+
+    def on_change(self, name, event, record, old):
+        if name != 'tickets':
+            return
+        if event == 'load':
+            self.latency = LatencyHistogram()
+            self._pending = []
+            for ticket in self.store.get('tickets'):
+                self._track(ticket)
+            heapq.heapify(self._pending)
+        elif event == 'append':
+            self._track(record, push=True)
+        elif event == 'update' and 'status' in old:
+            if old['status'] == 'verified':
+                self.latency.remove(self._latency_of(record, old.get('verified_at', record.get('verified_at'))))
+            self._track(record, push=True)
+        elif event == 'delete' and record.get('status') == 'verified':
+            self.latency.remove(self._latency_of(record, record.get('verified_at')))
+
+    def _track(self, ticket, push=False):
+        if ticket.get('status') == 'verified':
+            self.latency.add(self._latency_of(ticket, ticket.get('verified_at')))
+        elif ticket.get('status') == 'pending':
+            entry = (to_timestamp(ticket.get('created_at')), ticket['id'])
+            if push:
+                heapq.heappush(self._pending, entry)
+            else:
+                self._pending.append(entry)
+
+    def _latency_of(self, ticket, verified_at):
+        return max(to_timestamp(verified_at) - to_timestamp(ticket.get('created_at')), 0)
+
+    def _is_pending(self, entry):
+        ticket = self.store.by_id('tickets').get(entry[1])
+        return ticket is not None and ticket.get('status') == 'pending' \
+            and to_timestamp(ticket.get('created_at')) == entry[0]
+
+    def oldest_pending(self, n=5, older_than=None):
+        """The n longest-waiting pending tickets, oldest first.
+
+        With older_than (seconds), stop at the first ticket younger than that.
+        """
+        found = []
+        while self._pending and len(found) < n:
+            entry = heapq.heappop(self._pending)
+            if not self._is_pending(entry):
+                continue
+            found.append(entry)
+            if older_than is not None and time.time() - entry[0] <= older_than:
+                break
+        for entry in found:
+            heapq.heappush(self._pending, entry)
+        tickets = self.store.by_id('tickets')
+        if older_than is not None:
+            found = [entry for entry in found if time.time() - entry[0] > older_than]
+        return [tickets[ticket_id] for _, ticket_id in found]
+
+    def percentiles(self):
+        return {pct: self.latency.percentile(pct) for pct in (50, 90, 99)}
+
+
+class SalesCounters:
+    """Units sold per script and how often each pair of scripts shares a cart.
+
+    Counted once from the orders on load, then updated as orders are placed
+    or removed.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.sold = Counter()
+        self.together = defaultdict(Counter)
+        store.subscribe(self.on_change)
+
+    def on_change(self, name, event, record, old):
+        if name != 'orders':
+            return
+        if event == 'load':
+            self.sold = Counter()
+            self.together = defaultdict(Counter)
+            for order in self.store.get('orders'):
+                self._count(order, 1)
+        elif event == 'append':
+            self._count(record, 1)
+        elif event == 'delete':
+            self._count(record, -1)
+        elif 'items' in old:
+            self._count({'items': old['items']}, -1)
+            self._count(record, 1)
+
+    def _count(self, order, delta):
+        script_ids = {item.get('script_id', item.get('id')) for item in order.get('items', [])}
+        for script_id in script_ids:
+            self.sold[script_id] += delta
+            for other_id in script_ids:
+                if other_id != script_id:
+                    self.together[script_id][other_id] += delta
+
+    def best_sellers(self, scripts):
+        """scripts ordered by units sold, best first (ties keep their order)"""
+        return sorted(scripts, key=lambda script: -self.sold[script['id']])
+
+    def bought_with(self, script_id, n=3):
+        """IDs of the scripts most often in the same cart as script_id"""
+        if script_id not in self.together:
+            return []
+        return [other_id for other_id, count in self.together[script_id].most_common() if count > 0][:n]
+
+
+# Order status as stored in the status column; anything else is OTHER_STATUS
+STATUS_CODES = {'pending': 0, 'verified': 1}
+OTHER_STATUS = len(STATUS_CODES)
+
+
+def build_order_columns(orders):
+    """Columnar copy of a list of orders.
+
+    One entry per order in 'id', 'created_at' (epoch seconds), 'buyer_id',
+    'total_cents' and 'status'; order i's items are at
+    item_offsets[i]:item_offsets[i + 1] in 'item_script_id' and 'item_cents'.
+    """
+    n = len(orders)
+    items = [item for order in orders for item in order.get('items', ())]
+    counts = np.fromiter((len(order.get('items', ())) for order in orders), np.int64, n)
+    return {
+        'id': np.fromiter((order['id'] for order in orders), np.int64, n),
+        'created_at': np.fromiter((to_timestamp(order.get('created_at')) for order in orders), np.int64, n),
+        'buyer_id': np.fromiter((order.get('buyer_id') or 0 for order in orders), np.int64, n),
+        'total_cents': np.fromiter((to_cents(order.get('total_price')) for order in orders), np.int64, n),
+        'status': np.fromiter((STATUS_CODES.get(order.get('status'), OTHER_STATUS) for order in orders), np.int8, n),
+        'item_offsets': np.concatenate(([0], np.cumsum(counts))),
+        'item_script_id': np.fromiter((item.get('script_id', item.get('id')) for item in items),
+                                      np.int64, len(items)),
+        'item_cents': np.fromiter((to_cents(item.get('price')) for item in items), np.int64, len(items)),
+    }
+
+
+def _concat_columns(columns, more):
+    joined = {key: np.concatenate((columns[key], more[key])) for key in columns if key != 'item_offsets'}
+    joined['item_offsets'] = np.concatenate((columns['item_offsets'], more['item_offsets'][1:] + columns['item_offsets'][-1]))
+    return joined
+
+
+class OrderColumns:
+    """The order history as NumPy columns, kept current from store events.
+
+    The first build copies every order and runs on a worker thread. After
+    that, new orders are appended in one chunk and status or total changes
+    are patched in place when the next report is made; replacing or
+    deleting orders drops the columns so they are rebuilt.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.columns = None
+        self._appended = []
+        self._updated = {}
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        store.subscribe(self.on_change)
+
+    def on_change(self, name, event, record, old):
+        if name != 'orders':
+            return
+        if event == 'append':
+            self._appended.append(record)
+        elif event == 'update':
+            if 'status' in old or 'total_price' in old:
+                self._updated[record['id']] = record
+        else:
+            self.columns = None
+            self._generation += 1
+
+    async def refresh(self):
+        """Bring the columns up to date with the orders collection"""
+        while self.columns is None:
+            generation = self._generation
+            snapshot = list(self.store.get('orders'))
+            self._appended, self._updated = [], {}
+            columns = await asyncio.to_thread(build_order_columns, snapshot)
+            if generation == self._generation:
+                self.columns = columns
+
+        if self._appended:
+            self.columns = _concat_columns(self.columns, build_order_columns(self._appended))
+            self._appended = []
+        if self._updated:
+            ids = self.columns['id']
+            for order_id, order in self._updated.items():
+                row = np.searchsorted(ids, order_id)
+                if row < len(ids) and ids[row] == order_id:
+                    self.columns['status'][row] = STATUS_CODES.get(order.get('status'), OTHER_STATUS)
+                    self.columns['total_cents'][row] = to_cents(order.get('total_price'))
+            self._updated = {}
+        return self.columns
+
+    async def report(self, catalog, days=30):
+        """Deep Analytics report; the vectorized work runs on a worker thread"""
+        async with self._lock:
+            columns = await self.refresh()
+            return await asyncio.to_thread(deep_report, columns, catalog, days)
+
+
+def deep_report(columns, catalog, days=30):
+    """Revenue by script, category and day, conversion and order value percentiles.
+
+    catalog maps script ID -> (name, category) for the current scripts.
+    """
+    totals = columns['total_cents']
+    status = columns['status']
+    orders = len(totals)
+    report = {
+        'orders': orders,
+        'revenue': int(totals.sum()) / 100,
+        'conversion': float((status == STATUS_CODES['verified']).mean()) if orders else 0.0,
+        'percentiles': {},
+        'buyers': 0,
+        'repeat_buyers': 0,
+        'scripts': [],
+        'categories': [],
+    }
+    if orders:
+        for pct, value in zip((50, 90, 99), np.percentile(totals, [50, 90, 99])):
+            report['percentiles'][pct] = float(value) / 100
+        _, purchases = np.unique(columns['buyer_id'], return_counts=True)
+        report['buyers'] = len(purchases)
+        report['repeat_buyers'] = int((purchases > 1).sum())
+
+    # Per script and per category, from the order lines
+    script_ids, inverse = np.unique(columns['item_script_id'], return_inverse=True)
+    script_cents = np.bincount(inverse, weights=columns['item_cents'], minlength=len(script_ids))
+    script_sales = np.bincount(inverse, minlength=len(script_ids))
+    category_cents = {}
+    for script_id, cents, sales in zip(script_ids.tolist(), script_cents.tolist(), script_sales.tolist()):
+        name, category = catalog.get(script_id, (f"Script #{script_id} (removed)", "Removed"))
+        report['scripts'].append((name, cents / 100, sales))
+        category_cents[category] = category_cents.get(category, 0) + cents
+    report['scripts'].sort(key=lambda row: row[1], reverse=True)
+    report['categories'] = sorted(((category, cents / 100) for category, cents in category_cents.items()),
+                                  key=lambda row: row[1], reverse=True)
+
+    # Per local calendar day over the last `days` days, oldest first
+    offset = datetime.now().astimezone().utcoffset().total_seconds()
+    day = (columns['created_at'] + int(offset)) // 86400
+    first_day = (int(time.time()) + int(offset)) // 86400 - days + 1
+    recent = day >= first_day
+    report['daily_revenue'] = (np.bincount(day[recent] - first_day, weights=totals[recent],
+                                           minlength=days)[:days] / 100).tolist()
+    return report
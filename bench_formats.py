@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Data Format Benchmark for Discord Marketplace Bot
+Compares encode/decode time and file size of the data file formats on the
+real data files. Use --orders to pad the order history with synthetic
+orders built from the real catalog, to see how the formats scale.
+"""
+
+import argparse
+import random
+import time
+
+from storage import SERIALIZERS, decode_data, encode_data, load_data
+from marketplace_bot import DATA_FILES, make_order_item
+
+
+def synthetic_orders(scripts, count, start_id):
+    """Orders shaped like the ones checkout creates"""
+    if not scripts:
+        scripts = [{'id': 1, 'name': 'Sample Script', 'description': 'Sample description',
+                    'price': 9.99, 'category': 'Sample', 'created_at': int(time.time())}]
+    now = int(time.time())
+    orders = []
+    for i in range(count):
+        cart = random.sample(scripts, random.randint(1, min(3, len(scripts))))
+        orders.append({
+            'id': start_id + i,
+            'items': [make_order_item(script) for script in cart],
+            'buyer_email': "N/A",
+            'buyer_discord': f"user{i % 5000}",
+            'buyer_id': 100000000000000000 + i % 5000,
+            'total_price': sum(item['price'] for item in cart),
+            'status': 'pending',
+            'created_at': now - (count - i) * 60
+        })
+    return orders
+
+
+def time_call(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(name, data, repeat):
+    print(f"\n📁 {name} ({len(data)} records)")
+    print(f"  {'Format':<10}{'Size':>12}{'Encode':>12}{'Decode':>12}")
+    for fmt in SERIALIZERS:
+        payload = encode_data(data, fmt)
+        encode_time = time_call(lambda: encode_data(data, fmt), repeat)
+        decode_time = time_call(lambda: decode_data(payload), repeat)
+        assert decode_data(payload) == data
+        print(f"  {fmt:<10}{len(payload) / 1024:>9.1f} KB{encode_time * 1000:>9.2f} ms{decode_time * 1000:>9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data file formats")
+    parser.add_argument('--orders', type=int, default=0, help="Pad orders.json with this many synthetic orders")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    print("⏱️ Data Format Benchmark")
+    print("=" * 50)
+
+    for name, (file_path, default) in DATA_FILES.items():
+        data = load_data(file_path, type(default)())
+        if name == 'orders' and args.orders:
+            start_id = max((order['id'] for order in data), default=0) + 1
+            data = data + synthetic_orders(load_data(DATA_FILES['scripts'][0]), args.orders, start_id)
+        bench(f"{name} ({file_path})", data, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
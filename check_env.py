@@ -21,8 +21,23 @@ def check_env_vars():
     optional_vars = {
         'ADMIN_ROLE_ID': '1399949855799119952',
         'BUYER_ROLE_ID': '1406653314589786204', 
+        'VERIFY_SLA_HOURS': '24',
         'ADMIN_USERNAME': 'Zpofe0902',
-        'ADMIN_PASSWORD': '0902'
+        'ADMIN_PASSWORD': '0902',
+        'STORAGE_BACKEND': 'json',
+        'SQLITE_DB_FILE': 'marketplace.db',
+        'JOURNAL_COMPACT_MINUTES': '10',
+        'STORE_MAX_PENDING_WRITES': '100',
+        'STORE_FLUSH_WINDOW_MS': '250',
+        'STORE_FLUSH_THRESHOLD': '50',
+        'BACKUP_GENERATIONS': '3',
+        'DATA_FORMAT': 'pretty',
+        'SCRIPTS_FILE': 'scripts.json',
+        'ORDERS_FILE': 'orders.json',
+        'TICKETS_FILE': 'tickets.json',
+        'USER_SCRIPTS_FILE': 'user_scripts.json',
+        'SEQUENCES_FILE': 'sequences.json',
+        'ROLLUPS_FILE': 'rollups.json'
     }
     
     all_good = True
@@ -54,7 +69,12 @@ def check_env_vars():
             print(f"  ⚠️  {var}: {default} (default)")
     
     print("\n📁 Data Files:")
-    data_files = ['scripts.json', 'orders.json', 'tickets.json', 'user_scripts.json']
+    if os.getenv('STORAGE_BACKEND', 'json').lower() == 'sqlite':
+        data_files = [os.getenv('SQLITE_DB_FILE', 'marketplace.db')]
+    else:
+        data_files = [os.getenv(var, optional_vars[var]) for var in
+                      ('SCRIPTS_FILE', 'ORDERS_FILE', 'TICKETS_FILE', 'USER_SCRIPTS_FILE', 'SEQUENCES_FILE',
+                       'ROLLUPS_FILE')]
     for file in data_files:
         if os.path.exists(file):
             print(f"  ✅ {file}: Exists")
@@ -1,91 +1,348 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
-import json
 import os
+import time
 from datetime import datetime
+from itertools import islice
+from types import MappingProxyType
+from analytics import (HAVE_NUMPY, MarketplaceStats, OrderColumns, Rollups, SalesCounters,
+                       VerificationTracker, to_cents, to_timestamp)
+from storage import SERIALIZERS, DataStore, JournalBackend, JsonBackend, SqliteBackend
 
 # Bot configuration
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+
+class MarketplaceBot(commands.Bot):
+    async def close(self):
+        # Flush dirty data and make sure every queued write reaches the disk
+        await store.close()
+        await super().close()
+
+bot = MarketplaceBot(command_prefix='!', intents=intents)
 
 # Role IDs from environment variables with fallbacks
 ADMIN_ROLE_ID = int(os.getenv('ADMIN_ROLE_ID', '1399949855799119952'))
 BUYER_ROLE_ID = int(os.getenv('BUYER_ROLE_ID', '1406653314589786204'))
+# Payments should be verified within this many hours of the ticket opening
+VERIFY_SLA_HOURS = float(os.getenv('VERIFY_SLA_HOURS', '24'))
+
+# Storage backend: 'json' (default), 'journal' or 'sqlite'
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json').lower()
+SQLITE_DB_FILE = os.getenv('SQLITE_DB_FILE', 'marketplace.db')
+JOURNAL_COMPACT_MINUTES = float(os.getenv('JOURNAL_COMPACT_MINUTES', '10'))
+STORE_MAX_PENDING_WRITES = int(os.getenv('STORE_MAX_PENDING_WRITES', '100'))
+STORE_FLUSH_WINDOW_MS = int(os.getenv('STORE_FLUSH_WINDOW_MS', '250'))
+STORE_FLUSH_THRESHOLD = int(os.getenv('STORE_FLUSH_THRESHOLD', '50'))
+# Older versions of each data file kept as <file>.1 .. <file>.N
+BACKUP_GENERATIONS = int(os.getenv('BACKUP_GENERATIONS', '3'))
+# Data file format: 'pretty' (default) or 'compact' JSON, or binary 'pickle'/'marshal'
+DATA_FORMAT = os.getenv('DATA_FORMAT', 'pretty').lower()
 
 # Data files
-SCRIPTS_FILE = 'scripts.json'
-ORDERS_FILE = 'orders.json'
-TICKETS_FILE = 'tickets.json'
-USER_SCRIPTS_FILE = 'user_scripts.json'
+SCRIPTS_FILE = os.getenv('SCRIPTS_FILE', 'scripts.json')
+ORDERS_FILE = os.getenv('ORDERS_FILE', 'orders.json')
+TICKETS_FILE = os.getenv('TICKETS_FILE', 'tickets.json')
+USER_SCRIPTS_FILE = os.getenv('USER_SCRIPTS_FILE', 'user_scripts.json')
+SEQUENCES_FILE = os.getenv('SEQUENCES_FILE', 'sequences.json')
+ROLLUPS_FILE = os.getenv('ROLLUPS_FILE', 'rollups.json')
+
+DATA_FILES = {
+    'scripts': (SCRIPTS_FILE, []),
+    'orders': (ORDERS_FILE, []),
+    'tickets': (TICKETS_FILE, []),
+    'user_scripts': (USER_SCRIPTS_FILE, {}),
+    'sequences': (SEQUENCES_FILE, {}),
+    'rollups': (ROLLUPS_FILE, {})
+}
+
+def create_json_backend():
+    """Backend that keeps each collection in its own JSON data file"""
+    return JsonBackend(DATA_FILES, generations=BACKUP_GENERATIONS, fmt=DATA_FORMAT)
+
+def create_backend():
+    """Create the storage backend selected by STORAGE_BACKEND"""
+    if STORAGE_BACKEND == 'sqlite':
+        return SqliteBackend(SQLITE_DB_FILE)
+    if STORAGE_BACKEND == 'journal':
+        # Orders and tickets only grow, so they are appended to a journal
+        return JournalBackend(DATA_FILES, journaled=('orders', 'tickets'),
+                              generations=BACKUP_GENERATIONS, fmt=DATA_FORMAT)
+    return create_json_backend()
+
+def describe_storage():
+    """Human readable description of where marketplace data is stored"""
+    if STORAGE_BACKEND == 'sqlite':
+        return f"**SQLite Database:** {SQLITE_DB_FILE}"
+    description = f"**Scripts:** {SCRIPTS_FILE}\n**Orders:** {ORDERS_FILE}\n**Tickets:** {TICKETS_FILE}\n**User Scripts:** {USER_SCRIPTS_FILE}\n**ID Sequences:** {SEQUENCES_FILE}\n**Sales Rollups:** {ROLLUPS_FILE}"
+    description += f"\n**Format:** {DATA_FORMAT}"
+    if STORAGE_BACKEND == 'journal':
+        description += f"\n**Journal:** orders & tickets, compacted every {JOURNAL_COMPACT_MINUTES:g} min"
+    return description
+
+# Fields the store keeps lookup indexes on, besides 'id'
+STORE_INDEXES = {
+    'tickets': ('status', 'user_id', 'order_id'),
+    'orders': ('status', 'buyer_id'),
+}
+
+# In-memory data store, loaded once; changes are batched and flushed to the backend
+store = DataStore(
+    create_backend(),
+    max_pending_writes=STORE_MAX_PENDING_WRITES,
+    flush_window=STORE_FLUSH_WINDOW_MS / 1000,
+    flush_threshold=STORE_FLUSH_THRESHOLD,
+    indexes=STORE_INDEXES
+)
+
+# Running totals for the statistics panels, updated on every store change
+stats = MarketplaceStats(store)
+# Hourly and daily sales buckets, persisted in the 'rollups' collection
+rollups = Rollups(store)
+# Columnar order history for Deep Analytics (needs NumPy)
+order_columns = OrderColumns(store) if HAVE_NUMPY else None
+# Verification latency histogram and the pending tickets ordered by age
+verifications = VerificationTracker(store)
+# Units sold per script and scripts bought together, for the shop
+sales = SalesCounters(store)
 
 def init_data_files():
     """Initialize data files if they don't exist"""
-    files = [SCRIPTS_FILE, ORDERS_FILE, TICKETS_FILE, USER_SCRIPTS_FILE]
-    defaults = [[], [], [], {}]
-
-    for file_path, default in zip(files, defaults):
-        if not os.path.exists(file_path):
-            with open(file_path, 'w') as f:
-                json.dump(default, f)
+    store.init_files()
 
-def load_data(file_path):
-    """Load data from JSON file"""
-    try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return [] if file_path != USER_SCRIPTS_FILE else {}
+def load_scripts():
+    return store.get('scripts')
 
-def save_data(file_path, data):
-    """Save data to JSON file"""
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=2)
+def load_scripts_by_id():
+    return store.by_id('scripts')
 
-def load_scripts():
-    return load_data(SCRIPTS_FILE)
+def get_script(script_id):
+    return store.by_id('scripts').get(script_id)
 
-def save_scripts(scripts):
-    save_data(SCRIPTS_FILE, scripts)
+async def save_scripts(scripts):
+    await store.put('scripts', scripts)
 
 def load_orders():
-    return load_data(ORDERS_FILE)
+    return store.get('orders')
 
-def save_orders(orders):
-    save_data(ORDERS_FILE, orders)
+async def save_orders(orders):
+    await store.put('orders', orders)
+
+def get_order(order_id):
+    return store.by_id('orders').get(order_id)
+
+def count_orders(status):
+    return store.count_by('orders', 'status', status)
 
 def load_tickets():
-    return load_data(TICKETS_FILE)
+    return store.get('tickets')
+
+async def save_tickets(tickets):
+    await store.put('tickets', tickets)
+
+def get_ticket(ticket_id):
+    return store.by_id('tickets').get(ticket_id)
+
+def get_user_tickets(user_id):
+    return store.find_by('tickets', 'user_id', user_id)
+
+def count_tickets(status):
+    return store.count_by('tickets', 'status', status)
 
-def save_tickets(tickets):
-    save_data(TICKETS_FILE, tickets)
+def now_timestamp():
+    """Current time as stored in created_at/verified_at: epoch seconds"""
+    return int(time.time())
 
-def get_time_since_created(created_at_iso):
+def format_date(value):
+    return datetime.fromtimestamp(to_timestamp(value)).strftime('%Y-%m-%d')
+
+def latest_records(records, n):
+    """The n newest records, newest first; records are kept in creation order"""
+    return records[:-n - 1:-1] if n > 0 else []
+
+def format_duration(seconds):
+    """Render a duration in seconds as days/hours/minutes"""
+    days, remainder = divmod(int(seconds), 86400)
+    hours, remainder = divmod(remainder, 3600)
+    minutes, _ = divmod(remainder, 60)
+
+    if days > 0:
+        return f"{days} day{'s' if days != 1 else ''}, {hours} hour{'s' if hours != 1 else ''}"
+    elif hours > 0:
+        return f"{hours} hour{'s' if hours != 1 else ''}, {minutes} minute{'s' if minutes != 1 else ''}"
+    else:
+        return f"{minutes} minute{'s' if minutes != 1 else ''}"
+
+def get_time_since_created(created_at):
     """Calculate time since ticket was created"""
     try:
-        created_time = datetime.fromisoformat(created_at_iso)
-        current_time = datetime.now()
-        time_diff = current_time - created_time
-
-        days = time_diff.days
-        hours, remainder = divmod(time_diff.seconds, 3600)
-        minutes, _ = divmod(remainder, 60)
-
-        if days > 0:
-            return f"{days} day{'s' if days != 1 else ''}, {hours} hour{'s' if hours != 1 else ''}"
-        elif hours > 0:
-            return f"{hours} hour{'s' if hours != 1 else ''}, {minutes} minute{'s' if minutes != 1 else ''}"
-        else:
-            return f"{minutes} minute{'s' if minutes != 1 else ''}"
+        return format_duration(max(time.time() - to_timestamp(created_at), 0))
     except:
         return "Unknown"
 
-def load_user_scripts():
-    return load_data(USER_SCRIPTS_FILE)
+def make_order_item(script):
+    """Compact order line: script ID plus the name and price at purchase"""
+    return {'script_id': script['id'], 'name': script['name'], 'price': script['price']}
+
+def normalize_order_items(order):
+    """Replace full script copies in an order with compact order lines"""
+    order['items'] = [item if 'script_id' in item else make_order_item(item)
+                      for item in order.get('items', [])]
+    return order
+
+def resolve_order_items(order, scripts_by_id):
+    """Pair each order line with its current catalog script (None if deleted)"""
+    return [(item, scripts_by_id.get(item.get('script_id', item.get('id'))))
+            for item in order.get('items', [])]
 
-def save_user_scripts(user_scripts):
-    save_data(USER_SCRIPTS_FILE, user_scripts)
+def load_user_scripts():
+    return store.get('user_scripts')
+
+async def save_user_scripts(user_scripts):
+    await store.put('user_scripts', user_scripts)
+
+class GrantStore:
+    """Script access per user, keyed by int user ID.
+
+    user_scripts is stored as {"<user id>": [script IDs in grant order]}.
+    GrantStore keeps that dict, which is what gets written, in step with a
+    set of script IDs per user and a reverse index of script ID -> owners.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.total = 0
+        self._keys = {}
+        self._grants = {}
+        self._owners = {}
+        for key, script_ids in data.items():
+            if script_ids:
+                # Older versions stored the user ID as typed by the admin
+                try:
+                    user_id = int(key.strip())
+                except ValueError:
+                    print(f"⚠️ Skipping script grants for invalid user ID {key!r} in user_scripts")
+                    continue
+                if user_id in self._keys:
+                    print(f"⚠️ Skipping script grants for duplicate user ID {key!r} in user_scripts")
+                    continue
+                self._keys[user_id] = key
+                granted = self._grants.setdefault(user_id, set())
+                granted.update(script_ids)
+                for script_id in granted:
+                    self._owners.setdefault(script_id, set()).add(user_id)
+        self.total = sum(len(granted) for granted in self._grants.values())
+
+    def __len__(self):
+        return len(self._grants)
+
+    def __contains__(self, user_id):
+        return user_id in self._grants
+
+    def users(self):
+        return iter(self._grants)
+
+    def has(self, user_id, script_id):
+        return script_id in self._grants.get(user_id, ())
+
+    def scripts_of(self, user_id):
+        """Script IDs granted to a user, in the order they were granted"""
+        if user_id not in self._grants:
+            return []
+        return list(dict.fromkeys(self.data[self._keys[user_id]]))
+
+    def owners_of(self, script_id):
+        return self._owners.get(script_id, set())
+
+    def key_of(self, user_id):
+        """The user_scripts key holding a user's grants"""
+        return self._keys.get(user_id, str(user_id))
+
+    def grant(self, user_id, script_ids):
+        """Grant scripts to a user; returns the ones they didn't have yet"""
+        granted = self._grants.get(user_id, set())
+        new = [script_id for script_id in dict.fromkeys(script_ids) if script_id not in granted]
+        if new:
+            self._grants[user_id] = granted
+            key = self._keys.setdefault(user_id, str(user_id))
+            self.data.setdefault(key, []).extend(new)
+            granted.update(new)
+            for script_id in new:
+                self._owners.setdefault(script_id, set()).add(user_id)
+            self.total += len(new)
+        return new
+
+    def revoke(self, user_id, script_ids=None):
+        """Take scripts (by default all of them) away from a user; returns the ones removed"""
+        granted = self._grants.get(user_id)
+        if not granted:
+            return []
+        if script_ids is None:
+            removed = self.scripts_of(user_id)
+        else:
+            removed = [script_id for script_id in dict.fromkeys(script_ids) if script_id in granted]
+        if removed:
+            granted.difference_update(removed)
+            for script_id in removed:
+                self._owners[script_id].discard(user_id)
+            self.total -= len(removed)
+            key = self._keys[user_id]
+            if granted:
+                self.data[key] = [script_id for script_id in self.data[key] if script_id in granted]
+            else:
+                del self.data[key], self._keys[user_id], self._grants[user_id]
+        return removed
+
+    def revoke_everywhere(self, script_ids):
+        """Take scripts away from everyone who has them; returns the affected users"""
+        affected = set()
+        for script_id in script_ids:
+            for user_id in list(self.owners_of(script_id)):
+                self.revoke(user_id, [script_id])
+                affected.add(user_id)
+        return affected
+
+# Rebuilt whenever user_scripts is replaced or reloaded from disk
+_grant_store = {'source': None, 'grants': None}
+
+def load_grants():
+    user_scripts = load_user_scripts()
+    if _grant_store['source'] is not user_scripts:
+        _grant_store['grants'] = GrantStore(user_scripts)
+        _grant_store['source'] = user_scripts
+    return _grant_store['grants']
+
+def get_script_owners(script_id):
+    return load_grants().owners_of(script_id)
+
+async def grant_scripts(user_id, script_ids):
+    """Give a user access to scripts; returns the ones they didn't have yet"""
+    grants = load_grants()
+    new = grants.grant(user_id, script_ids)
+    if new:
+        key = grants.key_of(user_id)
+        await store.link('user_scripts', [(key, script_id) for script_id in new])
+    return new
+
+async def revoke_scripts(user_id, script_ids=None):
+    """Take scripts (by default all of them) away from a user; returns the ones removed"""
+    grants = load_grants()
+    key = grants.key_of(user_id)
+    removed = grants.revoke(user_id, script_ids)
+    if removed:
+        await store.unlink('user_scripts', [(key, script_id) for script_id in removed])
+    return removed
+
+async def revoke_scripts_from_all(script_ids):
+    """Take scripts away from everyone owning them; returns the affected users"""
+    grants = load_grants()
+    pairs = [(grants.key_of(user_id), script_id)
+             for script_id in dict.fromkeys(script_ids) for user_id in grants.owners_of(script_id)]
+    affected = grants.revoke_everywhere(script_ids)
+    if affected:
+        await store.unlink('user_scripts', pairs)
+    return affected
 
 def is_admin(user):
     """Check if user has admin role"""
@@ -95,10 +352,16 @@ def has_buyer_role(user):
     """Check if user has buyer role"""
     return any(role.id == BUYER_ROLE_ID for role in user.roles)
 
+@tasks.loop(minutes=JOURNAL_COMPACT_MINUTES)
+async def compact_journals():
+    """Periodically fold the order and ticket journals into their snapshots"""
+    await store.compact()
+
 @bot.event
 async def on_ready():
     print(f'{bot.user} has connected to Discord!')
-    init_data_files()
+    if STORAGE_BACKEND == 'journal' and not compact_journals.is_running():
+        compact_journals.start()
     try:
         synced = await bot.tree.sync()
         print(f"Synced {len(synced)} command(s)")
@@ -112,7 +375,7 @@ async def shop(interaction: discord.Interaction):
         await interaction.response.send_message("❌ You need administrator permissions to access the shop!", ephemeral=True)
         return
 
-    scripts = load_scripts()
+    scripts = catalog.snapshot.scripts
 
     if not scripts:
         embed = discord.Embed(
@@ -154,7 +417,7 @@ async def shop(interaction: discord.Interaction):
     embed.set_footer(text="🛍️ Public Shop Display | Personal shopping available", icon_url=bot.user.avatar.url if bot.user.avatar else None)
 
     # Create public shop view
-    view = PublicShopView(scripts)
+    view = PublicShopView()
     await interaction.response.send_message(embed=embed, view=view)
 
 @bot.tree.command(name='edit', description='Complete marketplace editor and setup (Admin only)')
@@ -164,16 +427,13 @@ async def edit_marketplace(interaction: discord.Interaction):
         await interaction.response.send_message("❌ You need administrator permissions to access the marketplace editor!", ephemeral=True)
         return
 
-    scripts = load_scripts()
-    orders = load_orders()
-    tickets = load_tickets()
-    user_scripts = load_user_scripts()
+    grants = load_grants()
 
     # Calculate statistics
-    total_revenue = sum(order.get('total_price', 0) for order in orders)
-    pending_orders = len([o for o in orders if o.get('status') == 'pending'])
-    verified_tickets = len([t for t in tickets if t.get('status') == 'verified'])
-    total_users_with_scripts = len(user_scripts)
+    total_revenue = stats.revenue
+    pending_orders = count_orders('pending')
+    verified_tickets = count_tickets('verified')
+    total_users_with_scripts = len(grants)
 
     embed = discord.Embed(
         title="⚙️ Marketplace Editor & Setup",
@@ -184,13 +444,13 @@ async def edit_marketplace(interaction: discord.Interaction):
 
     embed.add_field(
         name="📊 Current Statistics",
-        value=f"**Scripts:** {len(scripts)}\n**Orders:** {len(orders)}\n**Revenue:** ${total_revenue:.2f}\n**Active Users:** {total_users_with_scripts}",
+        value=f"**Scripts:** {stats.script_count}\n**Orders:** {stats.order_count}\n**Revenue:** ${total_revenue:.2f}\n**Active Users:** {total_users_with_scripts}",
         inline=True
     )
 
     embed.add_field(
         name="🎫 Ticket Status",
-        value=f"**Total:** {len(tickets)}\n**Verified:** {verified_tickets}\n**Pending:** {len(tickets) - verified_tickets}",
+        value=f"**Total:** {stats.ticket_count}\n**Verified:** {verified_tickets}\n**Pending:** {stats.ticket_count - verified_tickets}",
         inline=True
     )
 
@@ -212,16 +472,13 @@ async def admin_panel(interaction: discord.Interaction):
         await interaction.response.send_message("❌ You need administrator permissions to access the admin panel!", ephemeral=True)
         return
 
-    scripts = load_scripts()
-    orders = load_orders()
-    tickets = load_tickets()
-    user_scripts = load_user_scripts()
+    grants = load_grants()
 
     # Calculate statistics
-    total_revenue = sum(order.get('price', 0) for order in orders)
-    pending_orders = len([o for o in orders if o.get('status') == 'pending'])
-    verified_tickets = len([t for t in tickets if t.get('status') == 'verified'])
-    total_users_with_scripts = len(user_scripts)
+    total_revenue = stats.revenue
+    pending_orders = count_orders('pending')
+    verified_tickets = count_tickets('verified')
+    total_users_with_scripts = len(grants)
 
     embed = discord.Embed(
         title="🔧 Admin Control Panel",
@@ -232,22 +489,34 @@ async def admin_panel(interaction: discord.Interaction):
 
     embed.add_field(
         name="📊 Statistics",
-        value=f"**Scripts:** {len(scripts)}\n**Orders:** {len(orders)}\n**Revenue:** ${total_revenue:.2f}\n**Pending Orders:** {pending_orders}",
+        value=f"**Scripts:** {stats.script_count}\n**Orders:** {stats.order_count}\n**Revenue:** ${total_revenue:.2f}\n**Pending Orders:** {pending_orders}",
         inline=True
     )
 
     embed.add_field(
         name="🎫 Tickets",
-        value=f"**Total:** {len(tickets)}\n**Verified:** {verified_tickets}\n**Pending:** {len(tickets) - verified_tickets}",
+        value=f"**Total:** {stats.ticket_count}\n**Verified:** {verified_tickets}\n**Pending:** {stats.ticket_count - verified_tickets}",
         inline=True
     )
 
     embed.add_field(
         name="👥 Users",
-        value=f"**With Scripts:** {total_users_with_scripts}\n**Total Assignments:** {sum(len(scripts) for scripts in user_scripts.values())}",
+        value=f"**With Scripts:** {total_users_with_scripts}\n**Total Assignments:** {grants.total}",
         inline=True
     )
 
+    latency = verifications.percentiles()
+    if latency[50] is not None:
+        sla_seconds = VERIFY_SLA_HOURS * 3600
+        within_sla = verifications.latency.share_below(sla_seconds)
+        overdue = verifications.oldest_pending(10, older_than=sla_seconds)
+        embed.add_field(
+            name="⏱️ Verification Time",
+            value=f"**p50:** {format_duration(latency[50])}\n**p90:** {format_duration(latency[90])}\n**p99:** {format_duration(latency[99])}\n"
+                  f"**Within {VERIFY_SLA_HOURS:g}h SLA:** {within_sla * 100:.0f}%\n**Overdue Now:** {len(overdue)}{'+' if len(overdue) == 10 else ''}",
+            inline=False
+        )
+
     embed.add_field(
         name="🛠️ Management Tools",
         value="Use the buttons below to manage scripts, users, orders, and tickets",
@@ -302,7 +571,7 @@ class AdminPanelView(discord.ui.View):
 
     @discord.ui.button(label="👥 Manage Users", style=discord.ButtonStyle.secondary, emoji="👤")
     async def manage_users(self, interaction: discord.Interaction, button: discord.ui.Button):
-        user_scripts = load_user_scripts()
+        grants = load_grants()
 
         embed = discord.Embed(
             title="👥 User Management",
@@ -310,10 +579,10 @@ class AdminPanelView(discord.ui.View):
             color=0x9f7aea
         )
 
-        if user_scripts:
+        if grants:
             user_list = ""
-            for user_id, script_ids in list(user_scripts.items())[:8]:
-                user_list += f"<@{user_id}>: {len(script_ids)} scripts\n"
+            for user_id in islice(grants.users(), 8):
+                user_list += f"<@{user_id}>: {len(grants.scripts_of(user_id))} scripts\n"
 
             embed.add_field(
                 name="👤 Users with Scripts",
@@ -341,7 +610,7 @@ class AdminPanelView(discord.ui.View):
         )
 
         if tickets:
-            recent_tickets = sorted(tickets, key=lambda x: x['created_at'], reverse=True)[:5]
+            recent_tickets = latest_records(tickets, 5)
             ticket_list = ""
 
             for ticket in recent_tickets:
@@ -354,7 +623,21 @@ class AdminPanelView(discord.ui.View):
                 inline=False
             )
 
-            pending_count = len([t for t in tickets if t['status'] == 'pending'])
+            oldest = verifications.oldest_pending(5)
+            if oldest:
+                sla_seconds = VERIFY_SLA_HOURS * 3600
+                oldest_list = ""
+                for ticket in oldest:
+                    overdue = time.time() - to_timestamp(ticket['created_at']) > sla_seconds
+                    oldest_list += f"{'🔴' if overdue else '🕰️'} **#{ticket['id']}** - <@{ticket['user_id']}> waiting {get_time_since_created(ticket['created_at'])}\n"
+
+                embed.add_field(
+                    name="🕰️ Oldest Pending",
+                    value=oldest_list,
+                    inline=False
+                )
+
+            pending_count = count_tickets('pending')
             embed.add_field(
                 name="📊 Summary",
                 value=f"**Total:** {len(tickets)}\n**Pending:** {pending_count}\n**Verified:** {len(tickets) - pending_count}",
@@ -381,7 +664,7 @@ class AdminPanelView(discord.ui.View):
         )
 
         if orders:
-            recent_orders = sorted(orders, key=lambda x: x['created_at'], reverse=True)[:5]
+            recent_orders = latest_records(orders, 5)
             order_list = ""
 
             for order in recent_orders:
@@ -393,10 +676,9 @@ class AdminPanelView(discord.ui.View):
                 inline=False
             )
 
-            total_revenue = sum(order.get('total_price', 0) for order in orders)
             embed.add_field(
                 name="💰 Statistics",
-                value=f"**Total Orders:** {len(orders)}\n**Total Revenue:** ${total_revenue:.2f}",
+                value=f"**Total Orders:** {stats.order_count}\n**Total Revenue:** ${stats.revenue:.2f}",
                 inline=False
             )
         else:
@@ -463,7 +745,7 @@ class TicketManagementView(discord.ui.View):
     @discord.ui.button(label="📋 View All Tickets", style=discord.ButtonStyle.primary, emoji="🎫")
     async def view_all_tickets(self, interaction: discord.Interaction, button: discord.ui.Button):
         tickets = load_tickets()
-        orders = load_orders()
+        scripts_by_id = load_scripts_by_id()
 
         embed = discord.Embed(
             title="🎫 All Tickets",
@@ -477,10 +759,11 @@ class TicketManagementView(discord.ui.View):
                 time_open = get_time_since_created(ticket['created_at'])
 
                 # Get order details
-                order = next((o for o in orders if o['id'] == ticket['order_id']), None)
+                order = get_order(ticket['order_id'])
                 scripts_info = "Unknown"
                 if order and order.get('items'):
-                    script_names = [item['name'] for item in order['items']]
+                    script_names = [script['name'] if script else f"{item['name']} (removed)"
+                                    for item, script in resolve_order_items(order, scripts_by_id)]
                     scripts_info = ", ".join(script_names)
 
                 embed.add_field(
@@ -551,19 +834,16 @@ class AddScriptModal(discord.ui.Modal):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        scripts = load_scripts()
-
         script = {
-            'id': len(scripts) + 1,
+            'id': store.next_id('scripts'),
             'name': self.name.value,
             'description': self.description.value,
             'price': price,
             'category': self.category.value,
-            'created_at': datetime.now().isoformat()
+            'created_at': now_timestamp()
         }
 
-        scripts.append(script)
-        save_scripts(scripts)
+        await store.append('scripts', script)
 
         embed = discord.Embed(
             title="✅ Script Added Successfully!",
@@ -603,7 +883,7 @@ class AssignScriptModal(discord.ui.Modal):
     async def on_submit(self, interaction: discord.Interaction):
         try:
             script_id = int(self.script_id.value)
-            user_id = self.user_id.value
+            user_id = int(self.user_id.value)
         except ValueError:
             embed = discord.Embed(
                 title="❌ Invalid Input",
@@ -613,8 +893,7 @@ class AssignScriptModal(discord.ui.Modal):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        scripts = load_scripts()
-        script = next((s for s in scripts if s['id'] == script_id), None)
+        script = get_script(script_id)
 
         if not script:
             embed = discord.Embed(
@@ -625,12 +904,7 @@ class AssignScriptModal(discord.ui.Modal):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        user_scripts = load_user_scripts()
-
-        if user_id not in user_scripts:
-            user_scripts[user_id] = []
-
-        if script_id in user_scripts[user_id]:
+        if not await grant_scripts(user_id, [script_id]):
             embed = discord.Embed(
                 title="❌ Already Assigned",
                 description=f"User already has access to script: {script['name']}",
@@ -639,9 +913,6 @@ class AssignScriptModal(discord.ui.Modal):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        user_scripts[user_id].append(script_id)
-        save_user_scripts(user_scripts)
-
         embed = discord.Embed(
             title="✅ Script Assigned Successfully!",
             description=f"Script **{script['name']}** assigned to <@{user_id}>",
@@ -650,7 +921,7 @@ class AssignScriptModal(discord.ui.Modal):
 
         embed.add_field(
             name="📄 Details",
-            value=f"**Script ID:** {script_id}\n**User ID:** {user_id}\n**Price:** ${script['price']:.2f}",
+            value=f"**Script ID:** {script_id}\n**User ID:** {user_id}\n**Price:** ${script['price']:.2f}\n**Owners:** {len(get_script_owners(script_id))}",
             inline=False
         )
 
@@ -690,8 +961,18 @@ class VerifyPaymentModal(discord.ui.Modal):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        tickets = load_tickets()
-        ticket = next((t for t in tickets if t['id'] == ticket_id), None)
+        # Check and verify the ticket and its order as one unit of work
+        async with store.transaction('orders', 'tickets') as tx:
+            ticket = get_ticket(ticket_id)
+            already_verified = ticket is not None and ticket['status'] == 'verified'
+
+            if ticket and not already_verified:
+                tx.update('tickets', ticket_id, {
+                    'status': 'verified',
+                    'verified_by': interaction.user.id,
+                    'verified_at': now_timestamp()
+                })
+                tx.update('orders', ticket['order_id'], {'status': 'verified'})
 
         if not ticket:
             embed = discord.Embed(
@@ -702,7 +983,7 @@ class VerifyPaymentModal(discord.ui.Modal):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        if ticket['status'] == 'verified':
+        if already_verified:
             embed = discord.Embed(
                 title="❌ Already Verified",
                 description=f"Ticket #{ticket_id} is already verified",
@@ -711,12 +992,6 @@ class VerifyPaymentModal(discord.ui.Modal):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        # Update ticket status
-        ticket['status'] = 'verified'
-        ticket['verified_by'] = interaction.user.id
-        ticket['verified_at'] = datetime.now().isoformat()
-        save_tickets(tickets)
-
         # Give buyer role
         guild = interaction.guild
         user = guild.get_member(user_id)
@@ -877,7 +1152,7 @@ class MarketplaceEditorView(discord.ui.View):
 
     @discord.ui.button(label="👥 User Manager", style=discord.ButtonStyle.secondary, emoji="👤")
     async def user_manager(self, interaction: discord.Interaction, button: discord.ui.Button):
-        user_scripts = load_user_scripts()
+        grants = load_grants()
 
         embed = discord.Embed(
             title="👥 Advanced User Manager",
@@ -885,11 +1160,12 @@ class MarketplaceEditorView(discord.ui.View):
             color=0x9f7aea
         )
 
-        if user_scripts:
+        if grants:
             user_list = ""
-            for user_id, script_ids in list(user_scripts.items())[:6]:
+            for user_id in islice(grants.users(), 6):
+                script_ids = grants.scripts_of(user_id)
                 try:
-                    user = interaction.guild.get_member(int(user_id))
+                    user = interaction.guild.get_member(user_id)
                     username = user.display_name if user else f"User {user_id}"
                     user_list += f"**{username}:** {len(script_ids)} scripts\n"
                 except:
@@ -925,8 +1201,8 @@ class MarketplaceEditorView(discord.ui.View):
         )
 
         embed.add_field(
-            name="📊 Data Files",
-            value="**Scripts:** scripts.json\n**Orders:** orders.json\n**Tickets:** tickets.json\n**User Scripts:** user_scripts.json",
+            name="📊 Data Storage",
+            value=describe_storage(),
             inline=False
         )
 
@@ -941,10 +1217,7 @@ class MarketplaceEditorView(discord.ui.View):
 
     @discord.ui.button(label="📈 Analytics", style=discord.ButtonStyle.success, emoji="📊")
     async def analytics_dashboard(self, interaction: discord.Interaction, button: discord.ui.Button):
-        scripts = load_scripts()
-        orders = load_orders()
-        tickets = load_tickets()
-        user_scripts = load_user_scripts()
+        grants = load_grants()
 
         embed = discord.Embed(
             title="📈 Marketplace Analytics",
@@ -953,47 +1226,182 @@ class MarketplaceEditorView(discord.ui.View):
         )
 
         # Revenue analytics
-        total_revenue = sum(order.get('total_price', 0) for order in orders)
-        avg_order_value = total_revenue / len(orders) if orders else 0
-
         embed.add_field(
             name="💰 Revenue Analytics",
-            value=f"**Total Revenue:** ${total_revenue:.2f}\n**Total Orders:** {len(orders)}\n**Avg Order Value:** ${avg_order_value:.2f}",
+            value=f"**Total Revenue:** ${stats.revenue:.2f}\n**Total Orders:** {stats.order_count}\n**Avg Order Value:** ${stats.avg_order_value:.2f}",
             inline=True
         )
 
         # Script analytics
-        if scripts:
-            avg_price = sum(s['price'] for s in scripts) / len(scripts)
-            most_expensive = max(scripts, key=lambda x: x['price'])
+        if stats.script_count:
+            most_expensive = stats.most_expensive
             embed.add_field(
                 name="📚 Script Analytics",
-                value=f"**Total Scripts:** {len(scripts)}\n**Avg Price:** ${avg_price:.2f}\n**Most Expensive:** {most_expensive['name']} (${most_expensive['price']:.2f})",
+                value=f"**Total Scripts:** {stats.script_count}\n**Avg Price:** ${stats.avg_price:.2f}\n**Most Expensive:** {most_expensive['name']} (${most_expensive['price']:.2f})",
                 inline=True
             )
 
         # User analytics
-        total_script_assignments = sum(len(scripts) for scripts in user_scripts.values())
-        avg_scripts_per_user = total_script_assignments / len(user_scripts) if user_scripts else 0
+        total_script_assignments = grants.total
+        avg_scripts_per_user = total_script_assignments / len(grants) if grants else 0
+        month = rollups.last_days(30)
 
         embed.add_field(
             name="👥 User Analytics",
-            value=f"**Active Users:** {len(user_scripts)}\n**Total Assignments:** {total_script_assignments}\n**Avg Scripts/User:** {avg_scripts_per_user:.1f}",
+            value=f"**Users With Scripts:** {len(grants)}\n**Unique Buyers (30d):** ~{month['buyers']}\n**Verified Buyers (30d):** ~{month['verified_buyers']}\n**Total Assignments:** {total_script_assignments}\n**Avg Scripts/User:** {avg_scripts_per_user:.1f}",
             inline=True
         )
 
         # Recent activity
-        recent_orders = len([o for o in orders if o.get('created_at', '').startswith(datetime.now().strftime('%Y-%m-%d'))])
-        pending_tickets = len([t for t in tickets if t.get('status') == 'pending'])
+        recent_orders = rollups.last_days(1)['orders']
+        pending_tickets = stats.tickets_with_status('pending')
+        ticket_count = stats.ticket_count
 
         embed.add_field(
             name="📊 Recent Activity",
-            value=f"**Today's Orders:** {recent_orders}\n**Pending Tickets:** {pending_tickets}\n**Verification Rate:** {((len(tickets) - pending_tickets) / len(tickets) * 100) if tickets else 0:.1f}%",
+            value=f"**Today's Orders:** {recent_orders}\n**Pending Tickets:** {pending_tickets}\n**Verification Rate:** {((ticket_count - pending_tickets) / ticket_count * 100) if ticket_count else 0:.1f}%",
+            inline=False
+        )
+
+        week = rollups.last_days(7)
+        embed.add_field(
+            name="📅 Last 7 Days",
+            value=f"**Orders:** {week['orders']}\n**Revenue:** ${week['revenue']:.2f}\n**Unique Buyers:** ~{week['buyers']}\n**Verified:** {week['verified']}",
             inline=False
         )
 
         embed.set_footer(text="Analytics Dashboard | Real-time Data")
 
+        view = AnalyticsView()
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+class AnalyticsView(discord.ui.View):
+    def __init__(self):
+        super().__init__(timeout=300)
+
+    @discord.ui.button(label="📅 Sales Report", style=discord.ButtonStyle.primary, emoji="📊")
+    async def sales_report(self, interaction: discord.Interaction, button: discord.ui.Button):
+        modal = SalesReportModal()
+        await interaction.response.send_modal(modal)
+
+    @discord.ui.button(label="🔬 Deep Analytics", style=discord.ButtonStyle.secondary, emoji="🧮")
+    async def deep_analytics(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if order_columns is None:
+            await interaction.response.send_message("❌ Deep Analytics needs NumPy!\nInstall it with `pip install numpy` and restart the bot.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        script_info = {script['id']: (script['name'], script['category']) for script in load_scripts()}
+        report = await order_columns.report(script_info, days=30)
+
+        embed = discord.Embed(
+            title="🔬 Deep Analytics",
+            description=f"Vectorized analysis of {report['orders']} orders",
+            color=0x17a2b8
+        )
+
+        percentiles = report['percentiles']
+        embed.add_field(
+            name="💵 Order Value",
+            value=f"**Median:** ${percentiles.get(50, 0):.2f}\n**P90:** ${percentiles.get(90, 0):.2f}\n**P99:** ${percentiles.get(99, 0):.2f}",
+            inline=True
+        )
+
+        embed.add_field(
+            name="🎯 Conversion",
+            value=f"**Verified Orders:** {report['conversion'] * 100:.1f}%\n**Buyers:** {report['buyers']}\n**Repeat Buyers:** {report['repeat_buyers']}",
+            inline=True
+        )
+
+        top_scripts = "\n".join(f"**{name}:** ${revenue:.2f} ({sales} sold)" for name, revenue, sales in report['scripts'][:5])
+        embed.add_field(
+            name="🏆 Revenue by Script",
+            value=top_scripts or "No sales yet",
+            inline=False
+        )
+
+        categories = "\n".join(f"**{category}:** ${revenue:.2f}" for category, revenue in report['categories'][:5])
+        embed.add_field(
+            name="📂 Revenue by Category",
+            value=categories or "No sales yet",
+            inline=True
+        )
+
+        daily = report['daily_revenue']
+        peak = max(daily) or 1
+        sparkline = "".join("▁▂▃▄▅▆▇█"[min(int(value / peak * 8), 7)] for value in daily)
+        embed.add_field(
+            name="📈 Daily Revenue (30 days)",
+            value=f"`{sparkline}`\n**Total:** ${sum(daily):.2f} | **Best Day:** ${max(daily):.2f}",
+            inline=False
+        )
+
+        embed.set_footer(text="Deep Analytics | Powered by NumPy")
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+# Longest window a sales report covers; each day is one rollup lookup
+MAX_REPORT_DAYS = 3660
+
+class SalesReportModal(discord.ui.Modal):
+    def __init__(self):
+        super().__init__(title="Sales Report")
+
+        self.window = discord.ui.TextInput(
+            label="Time Window",
+            placeholder="today, 24h, 7d, 30d or 2025-01-01 to 2025-01-31",
+            required=True,
+            max_length=30
+        )
+
+        self.add_item(self.window)
+
+    async def on_submit(self, interaction: discord.Interaction):
+        window = self.window.value.strip().lower()
+        try:
+            if window == 'today':
+                label, totals = "Today", rollups.last_days(1)
+            elif window.endswith('h') and window[:-1].isdigit():
+                hours = int(window[:-1])
+                if not 1 <= hours <= 24 * rollups.hourly_retention_days:
+                    raise ValueError
+                label, totals = f"Last {hours} Hours", rollups.last_hours(hours)
+            elif window.endswith('d') and window[:-1].isdigit():
+                days = int(window[:-1])
+                if not 1 <= days <= MAX_REPORT_DAYS:
+                    raise ValueError
+                label, totals = f"Last {days} Days", rollups.last_days(days)
+            else:
+                start, end = (datetime.strptime(part.strip(), '%Y-%m-%d').date() for part in window.split(' to '))
+                if end < start or (end - start).days >= MAX_REPORT_DAYS:
+                    raise ValueError
+                label, totals = f"{start} to {end}", rollups.days(start, end)
+        except (ValueError, OverflowError):
+            embed = discord.Embed(
+                title="❌ Invalid Window",
+                description=f"Use today, 1h-{24 * rollups.hourly_retention_days}h, 1d-{MAX_REPORT_DAYS}d, or a range of up to {MAX_REPORT_DAYS} days like 2025-01-01 to 2025-01-31",
+                color=0xff0000
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+
+        avg_order_value = totals['revenue'] / totals['orders'] if totals['orders'] else 0
+        embed = discord.Embed(
+            title=f"📅 Sales Report - {label}",
+            color=0x17a2b8
+        )
+
+        embed.add_field(
+            name="🛒 Orders",
+            value=f"**Orders:** {totals['orders']}\n**Unique Buyers:** ~{totals['buyers']}\n**Verified Payments:** {totals['verified']}\n**Verified Buyers:** ~{totals['verified_buyers']}",
+            inline=True
+        )
+
+        embed.add_field(
+            name="💰 Revenue",
+            value=f"**Revenue:** ${totals['revenue']:.2f}\n**Avg Order Value:** ${avg_order_value:.2f}",
+            inline=True
+        )
+
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 class QuickSetupView(discord.ui.View):
@@ -1004,43 +1412,44 @@ class QuickSetupView(discord.ui.View):
     async def add_sample_scripts(self, interaction: discord.Interaction, button: discord.ui.Button):
         scripts = load_scripts()
 
+        # IDs come from the store's sequence so deleted IDs are never reused
         sample_scripts = [
             {
-                'id': len(scripts) + 1,
+                'id': store.next_id('scripts'),
                 'name': 'Discord Moderation Bot',
                 'description': 'Advanced Discord bot with auto-moderation, role management, and logging features.',
                 'price': 29.99,
                 'category': 'Discord Bots',
-                'created_at': datetime.now().isoformat()
+                'created_at': now_timestamp()
             },
             {
-                'id': len(scripts) + 2,
+                'id': store.next_id('scripts'),
                 'name': 'Web Scraper Pro',
                 'description': 'Professional web scraping tool with proxy support and data export.',
                 'price': 19.99,
                 'category': 'Automation',
-                'created_at': datetime.now().isoformat()
+                'created_at': now_timestamp()
             },
             {
-                'id': len(scripts) + 3,
+                'id': store.next_id('scripts'),
                 'name': 'Trading Bot Starter',
                 'description': 'Cryptocurrency trading bot with basic strategies and backtesting.',
                 'price': 49.99,
                 'category': 'Trading',
-                'created_at': datetime.now().isoformat()
+                'created_at': now_timestamp()
             },
             {
-                'id': len(scripts) + 4,
+                'id': store.next_id('scripts'),
                 'name': 'Game Automation Suite',
                 'description': 'Collection of game automation scripts for popular online games.',
                 'price': 15.99,
                 'category': 'Gaming',
-                'created_at': datetime.now().isoformat()
+                'created_at': now_timestamp()
             }
         ]
 
         scripts.extend(sample_scripts)
-        save_scripts(scripts)
+        await save_scripts(scripts)
 
         embed = discord.Embed(
             title="✅ Sample Scripts Added!",
@@ -1238,7 +1647,7 @@ class BulkScriptActionsView(discord.ui.View):
             script_text += f"**Price:** ${script['price']:.2f}\n"
             script_text += f"**Category:** {script['category']}\n"
             script_text += f"**Description:** {script['description']}\n"
-            script_text += f"**Created:** {script['created_at'][:10]}\n\n"
+            script_text += f"**Created:** {format_date(script['created_at'])}\n\n"
 
         # Discord has character limits, so we'll create a summary
         embed = discord.Embed(
@@ -1353,17 +1762,14 @@ class MarketplaceSettingsView(discord.ui.View):
 
     @discord.ui.button(label="📊 Backup Data", style=discord.ButtonStyle.primary, emoji="💾")
     async def backup_data(self, interaction: discord.Interaction, button: discord.ui.Button):
-        scripts = load_scripts()
-        orders = load_orders()
-        tickets = load_tickets()
-        user_scripts = load_user_scripts()
+        grants = load_grants()
 
         backup_info = {
-            'scripts': len(scripts),
-            'orders': len(orders),
-            'tickets': len(tickets),
-            'user_assignments': len(user_scripts),
-            'total_revenue': sum(order.get('total_price', 0) for order in orders),
+            'scripts': stats.script_count,
+            'orders': stats.order_count,
+            'tickets': stats.ticket_count,
+            'user_assignments': len(grants),
+            'total_revenue': stats.revenue,
             'backup_date': datetime.now().isoformat()
         }
 
@@ -1391,7 +1797,10 @@ class MarketplaceSettingsView(discord.ui.View):
             inline=False
         )
 
-        embed.set_footer(text="Data files: scripts.json, orders.json, tickets.json, user_scripts.json")
+        if STORAGE_BACKEND == 'sqlite':
+            embed.set_footer(text=f"Database: {SQLITE_DB_FILE}")
+        else:
+            embed.set_footer(text=f"Data files: {SCRIPTS_FILE}, {ORDERS_FILE}, {TICKETS_FILE}, {USER_SCRIPTS_FILE}")
 
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -1403,13 +1812,15 @@ class ConfirmClearView(discord.ui.View):
     @discord.ui.button(label="✅ Confirm Delete", style=discord.ButtonStyle.danger, emoji="⚠️")
     async def confirm_clear(self, interaction: discord.Interaction, button: discord.ui.Button):
         if self.data_type == "scripts":
-            save_scripts([])
-            message = "All scripts have been deleted!"
+            script_ids = [script['id'] for script in load_scripts()]
+            await save_scripts([])
+            affected = await revoke_scripts_from_all(script_ids)
+            message = f"All scripts have been deleted!\nAccess removed from {len(affected)} users."
         elif self.data_type == "all_data":
-            save_scripts([])
-            save_orders([])
-            save_tickets([])
-            save_user_scripts({})
+            await save_scripts([])
+            await save_orders([])
+            await save_tickets([])
+            await save_user_scripts({})
             message = "All marketplace data has been cleared!"
 
         embed = discord.Embed(
@@ -1473,7 +1884,7 @@ class BulkPriceUpdateModal(discord.ui.Modal):
                 script['price'] = round(old_price * (1 + percentage / 100), 2)
                 updated_count += 1
 
-        save_scripts(scripts)
+        await save_scripts(scripts)
 
         embed = discord.Embed(
             title="✅ Prices Updated!",
@@ -1606,8 +2017,7 @@ class EditScriptModal(discord.ui.Modal):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        scripts = load_scripts()
-        script_to_edit = next((script for script in scripts if script['id'] == script_id), None)
+        script_to_edit = get_script(script_id)
 
         if not script_to_edit:
             embed = discord.Embed(
@@ -1619,27 +2029,26 @@ class EditScriptModal(discord.ui.Modal):
             return
 
         changes = []
+        fields = {}
 
         if self.new_name.value:
-            old_name = script_to_edit['name']
-            script_to_edit['name'] = self.new_name.value
-            changes.append(f"Name: {old_name} → {self.new_name.value}")
+            fields['name'] = self.new_name.value
+            changes.append(f"Name: {script_to_edit['name']} → {self.new_name.value}")
 
         if self.new_price.value:
             try:
                 new_price = float(self.new_price.value)
-                old_price = script_to_edit['price']
-                script_to_edit['price'] = new_price
-                changes.append(f"Price: ${old_price:.2f} → ${new_price:.2f}")
+                fields['price'] = new_price
+                changes.append(f"Price: ${script_to_edit['price']:.2f} → ${new_price:.2f}")
             except ValueError:
                 pass
 
         if self.new_description.value:
-            script_to_edit['description'] = self.new_description.value
+            fields['description'] = self.new_description.value
             changes.append("Description updated")
 
         if changes:
-            save_scripts(scripts)
+            await store.update('scripts', script_id, fields)
             embed = discord.Embed(
                 title="✅ Script Updated Successfully!",
                 description=f"**{script_to_edit['name']}** has been updated!",
@@ -1685,21 +2094,21 @@ class DeleteScriptModal(discord.ui.Modal):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        scripts = load_scripts()
-        script_to_delete = None
-
-        for i, script in enumerate(scripts):
-            if script['id'] == script_id:
-                script_to_delete = scripts.pop(i)
-                break
+        script_to_delete = await store.delete('scripts', script_id)
 
         if script_to_delete:
-            save_scripts(scripts)
+            affected = await revoke_scripts_from_all([script_id])
             embed = discord.Embed(
                 title="✅ Script Deleted",
                 description=f"**{script_to_delete['name']}** has been deleted from the shop!",
                 color=0x28a745
             )
+            if affected:
+                embed.add_field(
+                    name="👥 Access Removed",
+                    value=f"Removed from {len(affected)} user{'s' if len(affected) != 1 else ''}",
+                    inline=False
+                )
         else:
             embed = discord.Embed(
                 title="❌ Script Not Found",
@@ -1723,10 +2132,10 @@ class ViewUserScriptsModal(discord.ui.Modal):
         self.add_item(self.user_id)
 
     async def on_submit(self, interaction: discord.Interaction):
-        user_scripts = load_user_scripts()
-        user_id = self.user_id.value
+        grants = load_grants()
+        user_id = self.user_id.value.strip()
 
-        if user_id not in user_scripts:
+        if not user_id.isdigit() or int(user_id) not in grants:
             embed = discord.Embed(
                 title="❌ User Not Found",
                 description=f"User ID {user_id} has no assigned scripts.",
@@ -1734,9 +2143,10 @@ class ViewUserScriptsModal(discord.ui.Modal):
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
+        user_id = int(user_id)
 
-        scripts = load_scripts()
-        user_script_ids = user_scripts[user_id]
+        scripts_by_id = load_scripts_by_id()
+        user_script_ids = grants.scripts_of(user_id)
 
         embed = discord.Embed(
             title=f"👤 User Scripts - {user_id}",
@@ -1745,7 +2155,7 @@ class ViewUserScriptsModal(discord.ui.Modal):
         )
 
         for script_id in user_script_ids:
-            script = next((s for s in scripts if s['id'] == script_id), None)
+            script = scripts_by_id.get(script_id)
             if script:
                 embed.add_field(
                     name=f"📄 {script['name']}",
@@ -1778,10 +2188,10 @@ class RemoveUserScriptsModal(discord.ui.Modal):
         self.add_item(self.script_id)
 
     async def on_submit(self, interaction: discord.Interaction):
-        user_scripts = load_user_scripts()
-        user_id = self.user_id.value
+        grants = load_grants()
+        user_id = self.user_id.value.strip()
 
-        if user_id not in user_scripts:
+        if not user_id.isdigit() or int(user_id) not in grants:
             embed = discord.Embed(
                 title="❌ User Not Found",
                 description=f"User ID {user_id} has no assigned scripts.",
@@ -1789,17 +2199,13 @@ class RemoveUserScriptsModal(discord.ui.Modal):
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
+        user_id = int(user_id)
 
         if self.script_id.value:
             # Remove specific script
             try:
                 script_id = int(self.script_id.value)
-                if script_id in user_scripts[user_id]:
-                    user_scripts[user_id].remove(script_id)
-                    if not user_scripts[user_id]:
-                        del user_scripts[user_id]
-                    save_user_scripts(user_scripts)
-
+                if await revoke_scripts(user_id, [script_id]):
                     embed = discord.Embed(
                         title="✅ Script Removed",
                         description=f"Script ID {script_id} removed from user {user_id}",
@@ -1819,8 +2225,7 @@ class RemoveUserScriptsModal(discord.ui.Modal):
                 )
         else:
             # Remove all scripts
-            del user_scripts[user_id]
-            save_user_scripts(user_scripts)
+            await revoke_scripts(user_id)
 
             embed = discord.Embed(
                 title="✅ All Scripts Removed",
@@ -1831,10 +2236,176 @@ class RemoveUserScriptsModal(discord.ui.Modal):
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 # Include the shop view classes from original code
+class CatalogSnapshot:
+    """Read-only copy of the scripts at one catalog version"""
+
+    def __init__(self, version, scripts):
+        self.version = version
+        self.scripts = tuple(MappingProxyType(dict(script)) for script in scripts)
+        self.by_id = MappingProxyType({script['id']: script for script in self.scripts})
+
+    def __len__(self):
+        return len(self.scripts)
+
+class Catalog:
+    """The current CatalogSnapshot of the scripts collection.
+
+    Any script change drops the snapshot; the next reader builds a new one
+    and swaps it in, so holders of an older snapshot keep a consistent view
+    and nobody copies the list per request.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.version = 0
+        self._snapshot = None
+        store.subscribe(self.on_change)
+
+    def on_change(self, name, event, record, old):
+        if name == 'scripts':
+            self.version += 1
+            self._snapshot = None
+
+    @property
+    def snapshot(self):
+        # store.get notices hand edits to the scripts file and reloads it,
+        # which drops the snapshot and bumps the version before we read them
+        scripts = self.store.get('scripts')
+        if self._snapshot is None:
+            self._snapshot = CatalogSnapshot(self.version, scripts)
+        return self._snapshot
+
+# Live catalog read by the shop views
+catalog = Catalog(store)
+
+class Cart:
+    """A shopper's cart: scripts keyed by ID in the order they were added.
+
+    The total is kept in cents as scripts come and go, and version counts
+    every change so views can tell whether the cart moved on since they
+    were shown.
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.total_cents = 0
+        self.version = 0
+        self.catalog_version = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, script_id):
+        return script_id in self.items
+
+    def __iter__(self):
+        return iter(self.items.values())
+
+    @property
+    def total(self):
+        return self.total_cents / 100
+
+    def add(self, script):
+        """Add a script; False if it is already in the cart"""
+        if script['id'] in self.items:
+            return False
+        self.items[script['id']] = script
+        self.total_cents += to_cents(script['price'])
+        self.version += 1
+        return True
+
+    def remove(self, script_id):
+        script = self.items.pop(script_id, None)
+        if script is not None:
+            self.total_cents -= to_cents(script['price'])
+            self.version += 1
+        return script
+
+    def clear(self):
+        self.items.clear()
+        self.total_cents = 0
+        self.version += 1
+
+    def sync(self, snapshot):
+        """Swap items for their versions in snapshot, dropping deleted scripts.
+
+        Returns True if the cart changed.
+        """
+        if snapshot.version == self.catalog_version:
+            return False
+        self.catalog_version = snapshot.version
+        items = {script_id: snapshot.by_id[script_id] for script_id in self.items if script_id in snapshot.by_id}
+        if len(items) == len(self.items) and all(items[script_id] == script for script_id, script in self.items.items()):
+            return False
+        self.items = items
+        self.total_cents = sum(to_cents(script['price']) for script in items.values())
+        self.version += 1
+        return True
+
+class ShopPageCache:
+    """Rendered shop pages, reused until the catalog or sales change.
+
+    Pages are keyed by (catalog version, sales version, sort, page, page size)
+    and hold the script lines and select option text without cart markers;
+    each view overlays its own cart on top.
+    """
+
+    def __init__(self, store, catalog):
+        self.store = store
+        self.catalog = catalog
+        self.sales_version = 0
+        self._pages = {}
+        self._orderings = {}
+        store.subscribe(self.on_change)
+
+    def on_change(self, name, event, record, old):
+        if name == 'orders' and (event != 'update' or 'items' in old):
+            # Best seller order and "bought with" hints follow the sales
+            self.sales_version += 1
+        elif name != 'scripts':
+            return
+        self._pages.clear()
+        self._orderings.clear()
+
+    def scripts(self, snapshot, best_sellers_first=False):
+        key = (snapshot.version, self.sales_version, best_sellers_first)
+        if key not in self._orderings:
+            self._orderings[key] = sales.best_sellers(snapshot.scripts) if best_sellers_first else snapshot.scripts
+        return self._orderings[key]
+
+    def page(self, index, page_size, best_sellers_first=False):
+        snapshot = self.catalog.snapshot
+        scripts = self.scripts(snapshot, best_sellers_first)
+        total_pages = max((len(scripts) + page_size - 1) // page_size, 1)
+        index = min(max(index, 0), total_pages - 1)
+        key = (snapshot.version, self.sales_version, best_sellers_first, index, page_size)
+        if key not in self._pages:
+            self._pages[key] = self._render(snapshot, scripts[index * page_size:(index + 1) * page_size],
+                                            index, total_pages, best_sellers_first)
+        return self._pages[key]
+
+    def _render(self, snapshot, scripts, index, total_pages, best_sellers_first):
+        lines = []
+        options = []
+        for script in scripts:
+            sold = f" - 🔥 {sales.sold[script['id']]} sold" if best_sellers_first and sales.sold[script['id']] > 0 else ""
+            lines.append((script['id'], f"{script['name']}** - ${script['price']:.2f} ({script['category']}){sold}"))
+
+            description = f"{script['category']} - {script['description'][:50]}{'...' if len(script['description']) > 50 else ''}"
+            bought_with = [snapshot.by_id.get(script_id) for script_id in sales.bought_with(script['id'], 2)]
+            bought_with = [other['name'] for other in bought_with if other]
+            if bought_with:
+                description = f"{script['category']} - Often bought with {', '.join(bought_with)}"
+            options.append((script['id'], f"{script['name']} - ${script['price']:.2f}", description[:100]))
+
+        return {'index': index, 'total_pages': total_pages, 'lines': lines, 'options': options}
+
+# Shop pages shared by every shopper's view
+shop_pages = ShopPageCache(store, catalog)
+
 class PublicShopView(discord.ui.View):
-    def __init__(self, scripts):
-        super().__init__(timeout=None)  # Persistent view
-        self.scripts = scripts
+    def __init__(self):
+        super().__init__(timeout=None)  # Persistent view; the shop itself reads the live catalog
 
     @discord.ui.button(label="Browse Shop", style=discord.ButtonStyle.primary, emoji="🛍️")
     async def browse_shop(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -1842,6 +2413,12 @@ class PublicShopView(discord.ui.View):
         if not is_admin(interaction.user):
             await interaction.response.send_message("❌ You need administrator permissions to access the shop!", ephemeral=True)
             return
+
+        # The shop reads the live catalog, which may have been emptied since /shop
+        if not len(catalog.snapshot):
+            await interaction.response.send_message("No scripts available at the moment. Contact an admin to add some scripts!", ephemeral=True)
+            return
+
         # Create personal shop embed
         embed = discord.Embed(
             title="Your Personal Shop",
@@ -1859,39 +2436,45 @@ class PublicShopView(discord.ui.View):
         embed.set_footer(text="Personal Shop Interface | Only visible to you", icon_url=bot.user.avatar.url if bot.user.avatar else None)
 
         # Create personal shop view with cart
-        view = ShopView(self.scripts, [])
+        view = ShopView(Cart())
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 class ShopView(discord.ui.View):
-    def __init__(self, scripts, cart):
+    def __init__(self, cart):
         super().__init__(timeout=600)
-        self.scripts = scripts
+        self.best_sellers_first = False
         self.cart = cart
         self.current_page = 0
         self.scripts_per_page = 10
 
         self.update_buttons()
 
+    def get_page(self):
+        # Reprice or drop cart items the catalog changed since they were added
+        self.cart.sync(catalog.snapshot)
+        page = shop_pages.page(self.current_page, self.scripts_per_page, self.best_sellers_first)
+        self.current_page = page['index']
+        return page
+
     def update_buttons(self):
         self.clear_items()
 
-        total_pages = (len(self.scripts) + self.scripts_per_page - 1) // self.scripts_per_page
-        start_idx = self.current_page * self.scripts_per_page
-        end_idx = min(start_idx + self.scripts_per_page, len(self.scripts))
-        current_scripts = self.scripts[start_idx:end_idx]
+        page = self.get_page()
+        total_pages = page['total_pages']
 
-        # Add script selection dropdown
-        script_select = ScriptSelectMenu(current_scripts, self.cart)
-        self.add_item(script_select)
+        # Add script selection dropdown; Discord rejects a select without options
+        if page['options']:
+            script_select = ScriptSelectMenu(page, self.cart)
+            self.add_item(script_select)
 
-        # Add to cart button
-        add_to_cart_button = discord.ui.Button(
-            label="Add Selected to Cart",
-            style=discord.ButtonStyle.success,
-            emoji="🛒"
-        )
-        add_to_cart_button.callback = self.add_selected_to_cart
-        self.add_item(add_to_cart_button)
+            # Add to cart button
+            add_to_cart_button = discord.ui.Button(
+                label="Add Selected to Cart",
+                style=discord.ButtonStyle.success,
+                emoji="🛒"
+            )
+            add_to_cart_button.callback = self.add_selected_to_cart
+            self.add_item(add_to_cart_button)
 
         # Navigation buttons
         if total_pages > 1:
@@ -1919,6 +2502,14 @@ class ShopView(discord.ui.View):
         cart_button.callback = self.view_cart
         self.add_item(cart_button)
 
+        sort_button = discord.ui.Button(
+            label="Catalog Order" if self.best_sellers_first else "Best Sellers",
+            style=discord.ButtonStyle.secondary,
+            emoji="📋" if self.best_sellers_first else "🔥"
+        )
+        sort_button.callback = self.toggle_sort
+        self.add_item(sort_button)
+
         if self.cart:
             checkout_button = discord.ui.Button(
                 label="Checkout",
@@ -1937,10 +2528,14 @@ class ShopView(discord.ui.View):
         self.update_buttons()
         await self.update_shop_embed(interaction)
 
+    async def toggle_sort(self, interaction: discord.Interaction):
+        self.best_sellers_first = not self.best_sellers_first
+        self.current_page = 0
+        self.update_buttons()
+        await self.update_shop_embed(interaction)
+
     async def update_shop_embed(self, interaction: discord.Interaction):
-        start_idx = self.current_page * self.scripts_per_page
-        end_idx = min(start_idx + self.scripts_per_page, len(self.scripts))
-        current_scripts = self.scripts[start_idx:end_idx]
+        page = self.get_page()
 
         embed = discord.Embed(
             title="Script Shop",
@@ -1951,9 +2546,9 @@ class ShopView(discord.ui.View):
 
         # Show available scripts in a clean list format
         scripts_text = ""
-        for script in current_scripts:
-            in_cart = "[IN CART] " if script['id'] in [s['id'] for s in self.cart] else ""
-            scripts_text += f"**{in_cart}{script['name']}** - ${script['price']:.2f} ({script['category']})\n"
+        for script_id, line in page['lines']:
+            in_cart = "[IN CART] " if script_id in self.cart else ""
+            scripts_text += f"**{in_cart}{line}\n"
 
         embed.add_field(
             name="Available Scripts",
@@ -1962,11 +2557,10 @@ class ShopView(discord.ui.View):
         )
 
         if self.cart:
-            total_price = sum(item['price'] for item in self.cart)
             cart_items = ", ".join([item['name'] for item in self.cart])
             embed.add_field(
                 name="Your Cart",
-                value=f"**Items:** {cart_items}\n**Total:** ${total_price:.2f}",
+                value=f"**Items:** {cart_items}\n**Total:** ${self.cart.total:.2f}",
                 inline=False
             )
         else:
@@ -1976,7 +2570,7 @@ class ShopView(discord.ui.View):
                 inline=False
             )
 
-        embed.set_footer(text=f"Page {self.current_page + 1}/{(len(self.scripts) + self.scripts_per_page - 1) // self.scripts_per_page} | Use dropdown to select scripts")
+        embed.set_footer(text=f"Page {page['index'] + 1}/{page['total_pages']} | Use dropdown to select scripts")
 
         await interaction.response.edit_message(embed=embed, view=self)
 
@@ -1996,18 +2590,16 @@ class ShopView(discord.ui.View):
             color=0x28a745
         )
 
-        total_price = 0
         for item in self.cart:
             embed.add_field(
                 name=item['name'],
                 value=f"💰 ${item['price']:.2f}\n📁 {item['category']}",
                 inline=True
             )
-            total_price += item['price']
 
         embed.add_field(
             name="💰 Total Price",
-            value=f"${total_price:.2f}",
+            value=f"${self.cart.total:.2f}",
             inline=False
         )
 
@@ -2029,9 +2621,8 @@ class ShopView(discord.ui.View):
         added_scripts = []
         for script_id in script_select.values:
             script_id_int = int(script_id)
-            script = next((s for s in self.scripts if s['id'] == script_id_int), None)
-            if script and not any(item['id'] == script_id_int for item in self.cart):
-                self.cart.append(script)
+            script = catalog.snapshot.by_id.get(script_id_int)
+            if script and self.cart.add(script):
                 added_scripts.append(script['name'])
 
         if added_scripts:
@@ -2052,34 +2643,36 @@ class ShopView(discord.ui.View):
         await self.process_checkout(interaction, self.cart)
 
     async def process_checkout(self, interaction: discord.Interaction, cart):
-        orders = load_orders()
-        total_price = sum(item['price'] for item in cart)
+        if cart.sync(catalog.snapshot) or not cart:
+            await interaction.response.send_message("🛒 Some scripts in your cart were updated or removed from the shop. Your cart has been refreshed, please review it before checking out.", ephemeral=True)
+            return
+
+        total_price = cart.total
 
         order = {
-            'id': len(orders) + 1,
-            'items': cart,
+            'id': store.next_id('orders'),
+            'items': [make_order_item(script) for script in cart],
             'buyer_email': "N/A",  # Email is not collected directly
             'buyer_discord': interaction.user.name,  # Discord username from interaction
             'buyer_id': interaction.user.id,
             'total_price': total_price,
             'status': 'pending',
-            'created_at': datetime.now().isoformat()
+            'created_at': now_timestamp()
         }
 
-        orders.append(order)
-        save_orders(orders)
-
         # Create ticket for payment verification
-        tickets = load_tickets()
         ticket = {
-            'id': len(tickets) + 1,
+            'id': store.next_id('tickets'),
             'order_id': order['id'],
             'user_id': interaction.user.id,
             'status': 'pending',
-            'created_at': datetime.now().isoformat()
+            'created_at': now_timestamp()
         }
-        tickets.append(ticket)
-        save_tickets(tickets)
+
+        # Order and ticket are committed together
+        async with store.transaction('orders', 'tickets') as tx:
+            tx.append('orders', order)
+            tx.append('tickets', ticket)
 
         # Create private ticket channel
         guild = interaction.guild
@@ -2103,7 +2696,6 @@ class ShopView(discord.ui.View):
             )
 
             # Calculate time since ticket opened
-            created_time = datetime.fromisoformat(ticket['created_at'])
             time_opened = "Just opened"
 
             # Get script names
@@ -2157,8 +2749,7 @@ class ShopView(discord.ui.View):
             )
 
             # Update ticket with channel ID
-            ticket['channel_id'] = ticket_channel.id
-            save_tickets(tickets)
+            await store.update('tickets', ticket['id'], {'channel_id': ticket_channel.id})
 
             # Send confirmation to user
             embed = discord.Embed(
@@ -2217,24 +2808,21 @@ class ShopView(discord.ui.View):
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
 class ScriptSelectMenu(discord.ui.Select):
-    def __init__(self, scripts, cart):
-        self.scripts = scripts
+    def __init__(self, page, cart):
+        self.page = page
         self.cart = cart
 
-        # Create options for the select menu
+        # Create options for the select menu from the cached page
         options = []
-        for script in scripts:
-            in_cart = any(item['id'] == script['id'] for item in cart)
-            label = f"{script['name']} - ${script['price']:.2f}"
+        for script_id, label, description in page['options']:
+            in_cart = script_id in cart
             if in_cart:
                 label = f"[IN CART] {label}"
 
-            description = f"{script['category']} - {script['description'][:50]}{'...' if len(script['description']) > 50 else ''}"
-
             options.append(discord.SelectOption(
                 label=label[:100],  # Discord limit
-                value=str(script['id']),
-                description=description[:100],  # Discord limit
+                value=str(script_id),
+                description=description,  # Truncated to the Discord limit in the page
                 emoji="🛒" if not in_cart else "✅"
             ))
 
@@ -2254,6 +2842,8 @@ class CartView(discord.ui.View):
         super().__init__(timeout=300)
         self.cart = cart
         self.shop_view = shop_view
+        # The cart as this view showed it
+        self.cart_version = cart.version
 
     @discord.ui.button(label="Clear Cart", style=discord.ButtonStyle.danger, emoji="🗑️")
     async def clear_cart(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -2267,6 +2857,13 @@ class CartView(discord.ui.View):
 
     @discord.ui.button(label="Proceed to Checkout", style=discord.ButtonStyle.success, emoji="💳")
     async def proceed_checkout(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.cart.version != self.cart_version:
+            await interaction.response.send_message("🛒 Your cart changed since this summary was shown. Open **View Cart** again to review it before checking out.", ephemeral=True)
+            return
+        if not self.cart:
+            await interaction.response.send_message("Your cart is empty!", ephemeral=True)
+            return
+
         # Direct checkout without form
         await self.shop_view.process_checkout(interaction, self.cart)
 
@@ -2313,15 +2910,13 @@ class GetScriptsPanelView(discord.ui.View):
             await interaction.response.send_message("❌ You need the Buyer role to access your scripts!\n\n**How to get the Buyer role:**\n1. Purchase scripts through the shop\n2. Complete payment in your ticket\n3. Wait for Zpofe to verify and assign scripts to your user ID\n4. Return here after verification to download your scripts", ephemeral=True)
             return
 
-        user_scripts = load_user_scripts()
-        user_id = str(interaction.user.id)
+        user_script_ids = load_grants().scripts_of(interaction.user.id)
 
-        if user_id not in user_scripts or not user_scripts[user_id]:
+        if not user_script_ids:
             await interaction.response.send_message("📦 No scripts available for you yet.\nContact an admin if you believe this is an error.", ephemeral=True)
             return
 
-        scripts = load_scripts()
-        user_script_ids = user_scripts[user_id]
+        scripts_by_id = load_scripts_by_id()
 
         # Try to send DM
         try:
@@ -2335,11 +2930,11 @@ class GetScriptsPanelView(discord.ui.View):
             dm_embed.set_footer(text="Zpofe's Script Shop | Your Personal Scripts")
 
             # Create script buttons for DM
-            dm_view = UserScriptsDMView(user_script_ids, scripts)
+            dm_view = UserScriptsView(user_script_ids, scripts_by_id)
 
             # Add script details to embed
             for script_id in user_script_ids:
-                script = next((s for s in scripts if s['id'] == script_id), None)
+                script = scripts_by_id.get(script_id)
                 if script:
                     dm_embed.add_field(
                         name=f"📄 {script['name']}",
@@ -2361,7 +2956,7 @@ class GetScriptsPanelView(discord.ui.View):
             )
 
             for script_id in user_script_ids:
-                script = next((s for s in scripts if s['id'] == script_id), None)
+                script = scripts_by_id.get(script_id)
                 if script:
                     embed.add_field(
                         name=f"📄 {script['name']}",
@@ -2375,7 +2970,7 @@ class GetScriptsPanelView(discord.ui.View):
                 inline=False
             )
 
-            view = UserScriptsView(user_script_ids, scripts)
+            view = UserScriptsView(user_script_ids, scripts_by_id)
             await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 @bot.tree.command(name='get_scripts', description='Get your purchased scripts (Buyer role required)')
@@ -2385,15 +2980,21 @@ async def get_scripts(interaction: discord.Interaction):
         await interaction.response.send_message("❌ You need the Buyer role to access your scripts!\n\n**How to get the Buyer role:**\n1. Purchase scripts through the shop\n2. Complete payment in your ticket\n3. Wait for Zpofe to assign scripts to your user ID\n4. Use this command after verification to access your scripts", ephemeral=True)
         return
 
-    user_scripts = load_user_scripts()
-    user_id = str(interaction.user.id)
+    user_script_ids = load_grants().scripts_of(interaction.user.id)
 
-    if user_id not in user_scripts or not user_scripts[user_id]:
+    if not user_script_ids:
         embed = discord.Embed(
             title="📦 No Scripts Available",
             description="You don't have any scripts assigned to you yet.\nContact an admin if you believe this is an error.",
             color=0xff0000
         )
+        pending = [t for t in get_user_tickets(interaction.user.id) if t['status'] == 'pending']
+        if pending:
+            embed.add_field(
+                name="⏳ Awaiting Verification",
+                value="\n".join(f"Ticket #{t['id']}" for t in pending[-5:]),
+                inline=False
+            )
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
 
@@ -2403,14 +3004,13 @@ async def get_scripts(interaction: discord.Interaction):
         color=0x28a745
     )
 
-    scripts = load_scripts()
-    user_script_ids = user_scripts[user_id]
+    scripts_by_id = load_scripts_by_id()
 
     # Create buttons for each script
-    view = UserScriptsView(user_script_ids, scripts)
+    view = UserScriptsView(user_script_ids, scripts_by_id)
 
     for script_id in user_script_ids:
-        script = next((s for s in scripts if s['id'] == script_id), None)
+        script = scripts_by_id.get(script_id)
         if script:
             embed.add_field(
                 name=f"📄 {script['name']}",
@@ -2422,13 +3022,13 @@ async def get_scripts(interaction: discord.Interaction):
     await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 class UserScriptsView(discord.ui.View):
-    def __init__(self, script_ids, scripts):
+    def __init__(self, script_ids, scripts_by_id):
         super().__init__(timeout=300)
         self.script_ids = script_ids
-        self.scripts = scripts
+        self.scripts_by_id = scripts_by_id
 
         for script_id in script_ids[:5]:  # Max 5 buttons per row
-            script = next((s for s in scripts if s['id'] == script_id), None)
+            script = scripts_by_id.get(script_id)
             if script:
                 button = ScriptDownloadButton(script)
                 self.add_item(button)
@@ -2483,6 +3083,13 @@ if __name__ == "__main__":
         exit(1)
     print("✅ Bot token found in environment variables")
 
+    # Check the data file format before anything is written with it
+    if DATA_FORMAT not in SERIALIZERS:
+        print(f"❌ Unknown DATA_FORMAT '{DATA_FORMAT}'!")
+        print(f"Please set DATA_FORMAT to one of: {', '.join(SERIALIZERS)}")
+        exit(1)
+    print(f"✅ Data format: {DATA_FORMAT}")
+
     # Check role IDs
     admin_role_env = os.getenv('ADMIN_ROLE_ID')
     buyer_role_env = os.getenv('BUYER_ROLE_ID')
@@ -2499,6 +3106,14 @@ if __name__ == "__main__":
         print(f"⚠️ Using default buyer role ID: {BUYER_ROLE_ID}")
         print("💡 Set BUYER_ROLE_ID environment variable to customize")
 
+    print("📁 Loading marketplace data...")
+    init_data_files()
+    store.load()
+
+    if not HAVE_NUMPY:
+        print("⚠️ NumPy not installed - Deep Analytics is disabled")
+        print("💡 Run 'pip install numpy' to enable it")
+
     print("🚀 Starting Discord bot...")
 
     try:
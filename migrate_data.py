@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Data Migration Tool for Discord Marketplace Bot
+Imports the existing JSON data files into the SQLite storage backend and
+upgrades stored data to the current layout. Stop the bot before running it.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from storage import (FORMAT_MAGIC, SQLITE_COLUMNS, JournalBackend, SqliteBackend, atomic_writer,
+                     load_data, rewrite_json_array, save_data)
+from marketplace_bot import (BACKUP_GENERATIONS, DATA_FILES, DATA_FORMAT, ORDERS_FILE,
+                             SQLITE_DB_FILE, STORAGE_BACKEND, normalize_order_items, to_timestamp)
+
+
+def migrate_to_sqlite(db_path, force=False):
+    print(f"📦 Migrating JSON data files into {db_path}")
+    print("=" * 50)
+
+    # Reading through the journal backend also picks up un-compacted journals
+    source = JournalBackend(DATA_FILES)
+    target = SqliteBackend(db_path)
+    target.init()
+
+    if not target.is_empty() and not force:
+        print("❌ Database already contains data! Use --force to overwrite it.")
+        return False
+
+    for name in target.collections:
+        data = source.load(name)
+        target.save(name, data)
+        print(f"  ✅ {name}: {len(data)} records imported")
+
+    print("\n🚀 Migration complete! Set STORAGE_BACKEND=sqlite to use the database.")
+    return True
+
+
+def rewrite_records(file_path, convert):
+    """Apply convert to every record of a data file and its journal, if any"""
+    if os.path.exists(file_path):
+        with open(file_path, 'rb') as f:
+            binary = f.read(len(FORMAT_MAGIC)) == FORMAT_MAGIC
+        if binary:
+            # Binary snapshots can't be streamed; convert them in one go
+            records = [convert(record) for record in load_data(file_path)]
+            save_data(file_path, records, BACKUP_GENERATIONS, DATA_FORMAT)
+            count = len(records)
+        else:
+            count = rewrite_json_array(file_path, convert, BACKUP_GENERATIONS,
+                                       'compact' if DATA_FORMAT == 'compact' else 'pretty')
+        print(f"  ✅ {file_path}: {count} records converted")
+
+    journal_path = file_path + '.journal'
+    if os.path.exists(journal_path):
+        count = 0
+        with open(journal_path, 'r') as src, atomic_writer(journal_path) as dst:
+            for line in src:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                convert(entry['record'])
+                dst.write((json.dumps(entry, separators=(',', ':')) + '\n').encode())
+                count += 1
+        print(f"  ✅ {journal_path}: {count} journal entries converted")
+
+
+def migrate_order_items():
+    """Replace the full script copies stored in orders with compact order lines"""
+    print("🧾 Converting order items to compact order lines")
+    print("=" * 50)
+
+    if STORAGE_BACKEND == 'sqlite':
+        backend = SqliteBackend(SQLITE_DB_FILE)
+        backend.init()
+        # Item rows already hold script_id, name and price; the rest of the
+        # script copy lives in the extra column
+        with backend.conn:
+            count = backend.conn.execute(
+                "UPDATE order_items SET extra = NULL WHERE extra IS NOT NULL").rowcount
+        print(f"  ✅ {SQLITE_DB_FILE}: {count} order items converted")
+    else:
+        rewrite_records(ORDERS_FILE, normalize_order_items)
+
+    print("\n🚀 Order items converted!")
+    return True
+
+
+def epoch_timestamps(record):
+    """Convert ISO created_at/verified_at strings to epoch seconds"""
+    for field in ('created_at', 'verified_at'):
+        if isinstance(record.get(field), str):
+            record[field] = to_timestamp(record[field])
+    return record
+
+
+def migrate_timestamps():
+    """Store created_at/verified_at as epoch seconds instead of ISO strings"""
+    print("🕒 Converting timestamps to epoch seconds")
+    print("=" * 50)
+
+    if STORAGE_BACKEND == 'sqlite':
+        backend = SqliteBackend(SQLITE_DB_FILE)
+        backend.init()
+        with backend.conn:
+            for table in ('scripts', 'orders', 'tickets'):
+                fields = [f for f in ('created_at', 'verified_at') if f in SQLITE_COLUMNS[table]]
+                rows = backend.conn.execute(f"SELECT rowid, {', '.join(fields)} FROM {table}").fetchall()
+                updates = [tuple(to_timestamp(v) if isinstance(v, str) else v
+                                 for v in values) + (rowid,)
+                           for rowid, *values in rows]
+                assignments = ", ".join(f"{f} = ?" for f in fields)
+                backend.conn.executemany(f"UPDATE {table} SET {assignments} WHERE rowid = ?", updates)
+                print(f"  ✅ {table}: {len(updates)} records converted")
+    else:
+        for name in ('scripts', 'orders', 'tickets'):
+            rewrite_records(DATA_FILES[name][0], epoch_timestamps)
+
+    print("\n🚀 Timestamps converted!")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate marketplace data between storage formats")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    sqlite_parser = subparsers.add_parser('sqlite', help="Import the JSON data files into SQLite")
+    sqlite_parser.add_argument('--db', default=SQLITE_DB_FILE, help="SQLite database file")
+    sqlite_parser.add_argument('--force', action='store_true', help="Overwrite a non-empty database")
+
+    subparsers.add_parser('order-items', help="Store order items as compact order lines")
+    subparsers.add_parser('timestamps', help="Store timestamps as epoch seconds")
+
+    args = parser.parse_args()
+
+    if args.command == 'sqlite':
+        ok = migrate_to_sqlite(args.db, args.force)
+    elif args.command == 'order-items':
+        ok = migrate_order_items()
+    elif args.command == 'timestamps':
+        ok = migrate_timestamps()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1271 @@
+"""
+Data storage for the Discord Script Marketplace Bot
+Keeps the marketplace data in memory and writes changes through to a backend
+"""
+
+import asyncio
+import json
+import marshal
+import os
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+def backup_path(file_path, generation):
+    """Path of an older generation of a data file (1 is the newest)"""
+    return f"{file_path}.{generation}"
+
+
+def file_signature(file_path):
+    """(mtime_ns, size) of a file, or None if it doesn't exist"""
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _parse_file(file_path):
+    """Parse a data file, falling back to the newest good backup"""
+    try:
+        with open(file_path, 'rb') as f:
+            return decode_data(f.read())
+    except ValueError:
+        generation = 1
+        while os.path.exists(backup_path(file_path, generation)):
+            try:
+                with open(backup_path(file_path, generation), 'rb') as f:
+                    data = decode_data(f.read())
+            except ValueError:
+                generation += 1
+                continue
+            print(f"⚠️ {file_path} is corrupted, recovered it from backup generation {generation}")
+            return data
+        raise
+
+
+def load_data(file_path, default=None):
+    """Load data from a data file, falling back to the newest good backup"""
+    try:
+        return _parse_file(file_path)
+    except FileNotFoundError:
+        return default if default is not None else []
+
+
+# Data file formats. JSON files have no header, so existing and hand-edited
+# files keep working; binary formats start with FORMAT_MAGIC and their name.
+# marshal is only readable by the Python version that wrote it, so it's
+# meant for snapshots that are rewritten regularly.
+FORMAT_MAGIC = b'\x00MKTDATA:'
+SERIALIZERS = {
+    'pretty': (lambda data: json.dumps(data, indent=2).encode(), json.loads),
+    'compact': (lambda data: json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8'), json.loads),
+    'pickle': (lambda data: pickle.dumps(data, protocol=5), pickle.loads),
+    'marshal': (marshal.dumps, marshal.loads),
+}
+BINARY_FORMATS = ('pickle', 'marshal')
+
+
+def encode_data(data, fmt='pretty'):
+    """Encode data in one of the data file formats"""
+    payload = SERIALIZERS[fmt][0](data)
+    if fmt in BINARY_FORMATS:
+        payload = FORMAT_MAGIC + fmt.encode() + b'\n' + payload
+    return payload
+
+
+def decode_data(payload):
+    """Decode a data file, detecting its format from the header"""
+    if not payload.startswith(FORMAT_MAGIC):
+        return json.loads(payload)
+    header, _, body = payload.partition(b'\n')
+    fmt = header[len(FORMAT_MAGIC):].decode()
+    if fmt not in BINARY_FORMATS:
+        raise ValueError(f"Unknown data file format: {fmt}")
+    try:
+        return SERIALIZERS[fmt][1](body)
+    except (EOFError, TypeError, pickle.UnpicklingError) as e:
+        raise ValueError(f"Corrupted {fmt} data file: {e}")
+
+
+def fsync_directory(directory):
+    """Make a rename or newly created file in a directory durable"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # Directories can't be opened on some platforms (Windows)
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def rotate_backups(file_path, generations):
+    """Shift the backups of a file down one generation and keep the current
+    file as generation 1. The current file is hard linked, so it never goes
+    missing while the new version is being put in place."""
+    oldest = backup_path(file_path, generations)
+    if os.path.exists(oldest):
+        os.remove(oldest)
+    for generation in range(generations - 1, 0, -1):
+        if os.path.exists(backup_path(file_path, generation)):
+            os.replace(backup_path(file_path, generation), backup_path(file_path, generation + 1))
+    if os.path.exists(file_path):
+        try:
+            os.link(file_path, backup_path(file_path, 1))
+        except OSError:
+            shutil.copy2(file_path, backup_path(file_path, 1))
+
+
+@contextmanager
+def atomic_writer(file_path, generations=0):
+    """Binary file handle whose contents atomically replace `file_path`.
+
+    The data is written to a temporary file in the same directory, fsynced
+    and renamed over the target when the block exits, so a crash leaves
+    either the old or the new version but never a truncated file. The last
+    `generations` versions are kept as `<file>.1` .. `<file>.N` for instant
+    recovery. If the block raises, the target is left untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates private files; keep the target's permissions
+        mode = os.stat(file_path).st_mode if os.path.exists(file_path) else 0o644
+        os.chmod(tmp_path, mode & 0o777)
+        if generations:
+            rotate_backups(file_path, generations)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_directory(directory)
+
+
+def write_file(file_path, payload, generations=0):
+    """Atomically replace a file with already encoded data"""
+    with atomic_writer(file_path, generations) as f:
+        f.write(payload)
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """Yield the elements of a JSON array from a text file one at a time,
+    without holding the whole array in memory"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError("Expected a JSON array")
+    pos = 1
+    eof = False
+
+    while True:
+        # Skip whitespace and separators up to the next element
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+            # Only trust the element once the character after it is buffered
+            complete = end < len(buffer) or eof
+        except ValueError:
+            if eof:
+                raise
+            complete = False
+
+        if complete:
+            yield element
+            pos = end
+            continue
+
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def rewrite_json_array(file_path, convert, generations=0, fmt='pretty'):
+    """Stream a JSON array file through `convert` one element at a time and
+    atomically replace it with the result. Returns the number of elements."""
+    count = 0
+    with open(file_path, 'r', encoding='utf-8') as src, atomic_writer(file_path, generations) as dst:
+        dst.write(b'[')
+        for element in iter_json_array(src):
+            element = convert(element)
+            if fmt == 'compact':
+                text = json.dumps(element, separators=(',', ':'), ensure_ascii=False)
+            else:
+                # Same layout json.dumps(data, indent=2) gives the whole array
+                text = '\n' + textwrap.indent(json.dumps(element, indent=2), '  ')
+            dst.write(((',' if count else '') + text).encode('utf-8'))
+            count += 1
+        dst.write(b'\n]' if count and fmt != 'compact' else b']')
+    return count
+
+
+def save_data(file_path, data, generations=0, fmt='pretty'):
+    """Save data to a data file"""
+    write_file(file_path, encode_data(data, fmt), generations)
+
+
+def snapshot_data(data):
+    """Copy of a collection that later in-memory changes can't reach.
+
+    Records of list collections are only changed by replacing field values,
+    so copying each record dict is enough. Dict collections (grants,
+    sequences, rollups) are small and changed in place at any depth, so they
+    are copied all the way down.
+    """
+    if isinstance(data, list):
+        return [dict(record) for record in data]
+    return _deep_copy(data)
+
+
+def _deep_copy(data):
+    if isinstance(data, dict):
+        return {key: _deep_copy(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_deep_copy(value) for value in data]
+    return data
+
+
+class Backend:
+    """Base class for storage backends.
+
+    Writes happen in two steps. `prepare_*` runs on the event loop and
+    captures everything the write needs while the data can't change under
+    it, as cheaply as it can (see snapshot_data); the job it returns does
+    the encoding and disk I/O on the writer thread. A prepare step may
+    return None when there is nothing to write.
+    """
+
+    collections = []
+
+    def init(self):
+        pass
+
+    def load(self, name):
+        raise NotImplementedError
+
+    def prepare_save(self, name, data):
+        raise NotImplementedError
+
+    def prepare_append(self, name, record, data):
+        return self.prepare_save(name, data)
+
+    def prepare_update(self, name, record, data):
+        return self.prepare_save(name, data)
+
+    def prepare_compact(self, name, data):
+        return None
+
+    def changed_on_disk(self, name):
+        """Whether a collection was changed by something other than the bot"""
+        return False
+
+    def prepare_batch(self, name, ops, data):
+        """Prepare one job that applies several queued ops to a collection"""
+        # 'link' and 'unlink' ops are written as a full save unless the
+        # backend stores dict-of-lists collections row by row
+        if any(op not in ('append', 'update') for op, _ in ops):
+            return self.prepare_save(name, data)
+        jobs = [self.prepare_append(name, record, data) if op == 'append'
+                else self.prepare_update(name, record, data)
+                for op, record in ops]
+
+        def job():
+            for batch_job in jobs:
+                batch_job()
+        return job
+
+    def prepare_commit(self, jobs):
+        """Combine the batch jobs of several collections into one job"""
+        def job():
+            for commit_job in jobs:
+                commit_job()
+        return job
+
+    def save(self, name, data):
+        """Replace a whole collection right away"""
+        self.prepare_save(name, data)()
+
+
+class JsonBackend(Backend):
+    """Stores every collection as a data file (JSON unless another format is set)"""
+
+    def __init__(self, files, generations=0, fmt='pretty'):
+        # files maps collection name -> (file path, empty default)
+        self.files = files
+        self.collections = list(files)
+        self.generations = generations
+        self.fmt = fmt
+        # Signature of each file as of our last load or write
+        self._signatures = {}
+
+    def init(self):
+        """Create any missing data files with their empty defaults"""
+        for file_path, default in self.files.values():
+            if not os.path.exists(file_path):
+                save_data(file_path, default, fmt=self.fmt)
+
+    def load(self, name):
+        file_path, default = self.files[name]
+        self._signatures[name] = file_signature(file_path)
+        return load_data(file_path, type(default)())
+
+    def changed_on_disk(self, name):
+        return file_signature(self.files[name][0]) != self._signatures.get(name)
+
+    def prepare_save(self, name, data):
+        # JSON files can only be rewritten as a whole
+        file_path = self.files[name][0]
+        snapshot = snapshot_data(data)
+
+        def job():
+            write_file(file_path, encode_data(snapshot, self.fmt), self.generations)
+            self._signatures[name] = file_signature(file_path)
+        return job
+
+    def prepare_batch(self, name, ops, data):
+        # Any number of changes costs a single rewrite
+        return self.prepare_save(name, data)
+
+
+class JournalBackend(JsonBackend):
+    """JSON files plus an append-only JSONL journal for growing collections.
+
+    New and changed records of journaled collections are appended to
+    `<file>.journal` and fsynced instead of rewriting the whole file. The
+    JSON file becomes a snapshot that compaction periodically brings up to
+    date before truncating the journal. Replaying is idempotent, so a crash
+    between writing the snapshot and truncating the journal loses nothing.
+    """
+
+    def __init__(self, files, journaled=('orders', 'tickets'), generations=0, fmt='pretty'):
+        super().__init__(files, generations, fmt)
+        self.journaled = set(journaled)
+        self._journals = {}
+        # Journal lines written since the last snapshot, per collection
+        self._pending = dict.fromkeys(self.journaled, 0)
+
+    def journal_path(self, name):
+        return self.files[name][0] + '.journal'
+
+    def changed_on_disk(self, name):
+        # Journaled snapshots are only ever rewritten by compaction
+        return name not in self.journaled and super().changed_on_disk(name)
+
+    def load(self, name):
+        data = super().load(name)
+        if name not in self.journaled or not os.path.exists(self.journal_path(name)):
+            return data
+
+        positions = {record['id']: i for i, record in enumerate(data)}
+        with open(self.journal_path(name), 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn final line from a crash mid-append
+                    continue
+                record = entry['record']
+                if record['id'] in positions:
+                    data[positions[record['id']]] = record
+                else:
+                    positions[record['id']] = len(data)
+                    data.append(record)
+                self._pending[name] += 1
+        return data
+
+    def prepare_append(self, name, record, data):
+        if name not in self.journaled:
+            return super().prepare_append(name, record, data)
+        return self._prepare_journal(name, 'append', record)
+
+    def prepare_update(self, name, record, data):
+        if name not in self.journaled:
+            return super().prepare_update(name, record, data)
+        return self._prepare_journal(name, 'update', record)
+
+    def prepare_save(self, name, data):
+        write_snapshot = super().prepare_save(name, data)
+        if name not in self.journaled:
+            return write_snapshot
+        self._pending[name] = 0
+
+        def job():
+            write_snapshot()
+            self._truncate_journal(name)
+        return job
+
+    def prepare_compact(self, name, data):
+        """Fold the journal into the snapshot file"""
+        if not self._pending.get(name):
+            return None
+        return self.prepare_save(name, data)
+
+    def prepare_batch(self, name, ops, data):
+        if name not in self.journaled or any(op == 'save' for op, _ in ops):
+            return super().prepare_batch(name, ops, data)
+        # All lines of the batch share one write and one fsync
+        lines = ''.join(json.dumps({'op': op, 'record': record}, separators=(',', ':')) + '\n' for op, record in ops)
+        self._pending[name] += len(ops)
+        return lambda: self._write_journal(name, lines)
+
+    def _prepare_journal(self, name, op, record):
+        line = json.dumps({'op': op, 'record': record}, separators=(',', ':')) + '\n'
+        self._pending[name] += 1
+        return lambda: self._write_journal(name, line)
+
+    def _write_journal(self, name, lines):
+        journal = self._journals.get(name)
+        if journal is None:
+            created = not os.path.exists(self.journal_path(name))
+            if not created:
+                _drop_torn_line(self.journal_path(name))
+            journal = self._journals[name] = open(self.journal_path(name), 'a')
+            if created:
+                fsync_directory(os.path.dirname(os.path.abspath(self.journal_path(name))))
+        journal.write(lines)
+        journal.flush()
+        os.fsync(journal.fileno())
+
+    def _truncate_journal(self, name):
+        journal = self._journals.pop(name, None)
+        if journal is not None:
+            journal.close()
+        if os.path.exists(self.journal_path(name)):
+            open(self.journal_path(name), 'w').close()
+
+
+def _drop_torn_line(path, chunk_size=65536):
+    """Cut a journal back to its last complete line.
+
+    A crash mid-append can leave a partial last line. Appending after it
+    would glue the next entry onto it, and load would skip both.
+    """
+    with open(path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        keep = end
+        while keep > 0:
+            start = max(keep - chunk_size, 0)
+            f.seek(start)
+            newline = f.read(keep - start).rfind(b'\n')
+            if newline != -1:
+                keep = start + newline + 1
+                break
+            keep = start
+        if keep != end:
+            f.truncate(keep)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# Column layout of the SQLite tables. Fields not listed here are kept in the
+# `extra` column as JSON so records round-trip unchanged.
+SQLITE_COLUMNS = {
+    'scripts': ['id', 'name', 'description', 'price', 'category', 'created_at'],
+    'orders': ['id', 'buyer_id', 'buyer_discord', 'buyer_email', 'total_price', 'status', 'created_at'],
+    'order_items': ['order_id', 'position', 'script_id', 'name', 'price'],
+    'tickets': ['id', 'order_id', 'user_id', 'status', 'created_at', 'channel_id', 'verified_by', 'verified_at'],
+}
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scripts (
+    id INTEGER NOT NULL,
+    name TEXT,
+    description TEXT,
+    price REAL,
+    category TEXT,
+    created_at INTEGER,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER NOT NULL,
+    buyer_id INTEGER,
+    buyer_discord TEXT,
+    buyer_email TEXT,
+    total_price REAL,
+    status TEXT,
+    created_at INTEGER,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    script_id INTEGER,
+    name TEXT,
+    price REAL,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER NOT NULL,
+    order_id INTEGER,
+    user_id INTEGER,
+    status TEXT,
+    created_at INTEGER,
+    channel_id INTEGER,
+    verified_by INTEGER,
+    verified_at INTEGER,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS user_scripts (
+    user_id TEXT NOT NULL,
+    script_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, script_id)
+);
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scripts_id ON scripts (id);
+CREATE INDEX IF NOT EXISTS idx_orders_id ON orders (id);
+CREATE INDEX IF NOT EXISTS idx_orders_buyer_id ON orders (buyer_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status);
+CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at);
+CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_script_id ON order_items (script_id);
+CREATE INDEX IF NOT EXISTS idx_tickets_id ON tickets (id);
+CREATE INDEX IF NOT EXISTS idx_tickets_order_id ON tickets (order_id);
+CREATE INDEX IF NOT EXISTS idx_tickets_user_id ON tickets (user_id);
+CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (status);
+CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON tickets (created_at);
+CREATE INDEX IF NOT EXISTS idx_user_scripts_script_id ON user_scripts (script_id);
+"""
+
+
+def _to_row(table, record):
+    """Split a record into its column values plus a JSON blob of the rest"""
+    columns = SQLITE_COLUMNS[table]
+    extra = {k: v for k, v in record.items() if k not in columns and k != 'items'}
+    return tuple(record.get(c) for c in columns) + (json.dumps(extra) if extra else None,)
+
+
+def _from_row(table, row):
+    """Rebuild a record from a table row, dropping empty optional columns"""
+    columns = SQLITE_COLUMNS[table]
+    record = {c: v for c, v in zip(columns, row) if v is not None}
+    if row[-1]:
+        record.update(json.loads(row[-1]))
+    return record
+
+
+class SqliteBackend(Backend):
+    """Stores the collections in an indexed SQLite database"""
+
+    collections = ['scripts', 'orders', 'tickets', 'user_scripts', 'sequences', 'rollups']
+    # Small dict collections stored as one JSON document each
+    documents = ['sequences', 'rollups']
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # Tables are created and loaded once at startup, before the bot runs;
+        # after that only the storage writer thread uses the connection
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._depth = 0
+
+    def init(self):
+        """Create the tables and indexes if they don't exist"""
+        with self.conn:
+            self.conn.executescript(SQLITE_SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        """Commit once when the outermost transaction block exits"""
+        self._depth += 1
+        try:
+            yield
+        except BaseException:
+            if self._depth == 1:
+                self.conn.rollback()
+            raise
+        else:
+            if self._depth == 1:
+                self.conn.commit()
+        finally:
+            self._depth -= 1
+
+    def prepare_commit(self, jobs):
+        # Changes to several collections land in a single SQLite transaction
+        def job():
+            with self._transaction():
+                for commit_job in jobs:
+                    commit_job()
+        return job
+
+    def is_empty(self):
+        return not any(
+            self.conn.execute(f"SELECT 1 FROM {name} LIMIT 1").fetchone()
+            for name in self.collections if name not in self.documents
+        )
+
+    def load(self, name):
+        if name in self.documents:
+            row = self.conn.execute("SELECT body FROM documents WHERE name = ?", (name,)).fetchone()
+            return json.loads(row[0]) if row else {}
+
+        if name == 'user_scripts':
+            user_scripts = {}
+            for user_id, script_id in self.conn.execute(
+                    "SELECT user_id, script_id FROM user_scripts ORDER BY rowid"):
+                user_scripts.setdefault(user_id, []).append(script_id)
+            return user_scripts
+
+        columns = ", ".join(SQLITE_COLUMNS[name] + ['extra'])
+        records = [_from_row(name, row) for row in
+                   self.conn.execute(f"SELECT {columns} FROM {name} ORDER BY rowid")]
+
+        if name == 'orders':
+            items = {}
+            item_columns = ", ".join(SQLITE_COLUMNS['order_items'] + ['extra'])
+            for row in self.conn.execute(
+                    f"SELECT {item_columns} FROM order_items ORDER BY order_id, position"):
+                item = _from_row('order_items', row)
+                order_id = item.pop('order_id')
+                item.pop('position')
+                if 'id' in item:
+                    # Full script copy; script_id was derived from its id
+                    item.pop('script_id', None)
+                items.setdefault(order_id, []).append(item)
+            for order in records:
+                order['items'] = items.get(order['id'], [])
+
+        return records
+
+    def prepare_save(self, name, data):
+        """Replace a whole collection"""
+        if name in self.documents:
+            body = json.dumps(data)
+
+            def job():
+                with self._transaction():
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO documents (name, body) VALUES (?, ?)", (name, body))
+            return job
+
+        if name == 'user_scripts':
+            rows = [(str(user_id), script_id) for user_id, script_ids in data.items()
+                    for script_id in script_ids]
+
+            def job():
+                with self._transaction():
+                    self.conn.execute("DELETE FROM user_scripts")
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO user_scripts (user_id, script_id) VALUES (?, ?)", rows)
+            return job
+
+        rows = [self._rows(name, record) for record in data]
+
+        def job():
+            with self._transaction():
+                self.conn.execute(f"DELETE FROM {name}")
+                if name == 'orders':
+                    self.conn.execute("DELETE FROM order_items")
+                for row, item_rows in rows:
+                    self._insert(name, row, item_rows)
+        return job
+
+    def prepare_append(self, name, record, data):
+        """Insert a single new record"""
+        row, item_rows = self._rows(name, record)
+
+        def job():
+            with self._transaction():
+                self._insert(name, row, item_rows)
+        return job
+
+    def prepare_update(self, name, record, data):
+        """Rewrite a single existing record"""
+        row, item_rows = self._rows(name, record)
+        record_id = record['id']
+        assignments = ", ".join(f"{c} = ?" for c in SQLITE_COLUMNS[name] + ['extra'])
+
+        def job():
+            with self._transaction():
+                self.conn.execute(f"UPDATE {name} SET {assignments} WHERE id = ?", row + (record_id,))
+                if name == 'orders':
+                    self.conn.execute("DELETE FROM order_items WHERE order_id = ?", (record_id,))
+                    self._insert_items(item_rows)
+        return job
+
+    def prepare_batch(self, name, ops, data):
+        if name == 'user_scripts' and not any(op == 'save' for op, _ in ops):
+            return self._prepare_links(ops)
+        if name == 'user_scripts' or name in self.documents or any(op == 'save' for op, _ in ops):
+            return super().prepare_batch(name, ops, data)
+        # Apply the whole batch in a single transaction
+        rows = [(op, record['id']) + self._rows(name, record) for op, record in ops]
+        assignments = ", ".join(f"{c} = ?" for c in SQLITE_COLUMNS[name] + ['extra'])
+
+        def job():
+            with self._transaction():
+                for op, record_id, row, item_rows in rows:
+                    if op == 'append':
+                        self._insert(name, row, item_rows)
+                        continue
+                    self.conn.execute(f"UPDATE {name} SET {assignments} WHERE id = ?", row + (record_id,))
+                    if name == 'orders':
+                        self.conn.execute("DELETE FROM order_items WHERE order_id = ?", (record_id,))
+                        self._insert_items(item_rows)
+        return job
+
+    def _prepare_links(self, ops):
+        """Insert or delete just the granted and revoked user_scripts rows"""
+        rows = [(op, str(user_id), script_id) for op, (user_id, script_id) in ops]
+
+        def job():
+            with self._transaction():
+                for op, user_id, script_id in rows:
+                    if op == 'link':
+                        self.conn.execute(
+                            "INSERT OR IGNORE INTO user_scripts (user_id, script_id) VALUES (?, ?)",
+                            (user_id, script_id))
+                    else:
+                        self.conn.execute(
+                            "DELETE FROM user_scripts WHERE user_id = ? AND script_id = ?",
+                            (user_id, script_id))
+        return job
+
+    def _rows(self, name, record):
+        """Table row for a record, plus the item rows of an order"""
+        item_rows = []
+        if name == 'orders':
+            item_rows = [_to_row('order_items', dict(item, order_id=record['id'], position=position,
+                                                     script_id=item.get('script_id', item.get('id'))))
+                         for position, item in enumerate(record.get('items', []))]
+        return _to_row(name, record), item_rows
+
+    def _insert(self, name, row, item_rows):
+        columns = SQLITE_COLUMNS[name] + ['extra']
+        placeholders = ", ".join("?" for _ in columns)
+        self.conn.execute(f"INSERT INTO {name} ({', '.join(columns)}) VALUES ({placeholders})", row)
+        if name == 'orders':
+            self._insert_items(item_rows)
+
+    def _insert_items(self, item_rows):
+        item_columns = SQLITE_COLUMNS['order_items'] + ['extra']
+        item_placeholders = ", ".join("?" for _ in item_columns)
+        self.conn.executemany(
+            f"INSERT INTO order_items ({', '.join(item_columns)}) VALUES ({item_placeholders})",
+            item_rows)
+
+
+class StorageWriter:
+    """Runs storage jobs one at a time on a background thread.
+
+    Each write is queued together with a future that the caller awaits, so
+    handlers never block the event loop on disk I/O. The queue is bounded;
+    when it is full, callers wait for room, which applies backpressure to
+    bursts of writes. A job's prepare step runs on the event loop right
+    before the job is handed to the thread, in queue order.
+    """
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='storage-writer')
+        self._queue = None
+        self._task = None
+
+    def _start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(self.max_pending)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, prepare):
+        """Queue a write and wait until it has been written"""
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prepare, future))
+        return await future
+
+    async def drain(self):
+        """Wait for every queued write to finish"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            prepare, future = await self._queue.get()
+            try:
+                job = prepare()
+                if job is not None:
+                    await loop.run_in_executor(self._executor, job)
+            except Exception as e:
+                print(f"Error writing marketplace data: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(None)
+            finally:
+                self._queue.task_done()
+
+
+class Transaction:
+    """Unit of work over one or more collections.
+
+    Entering takes the per-collection locks in the store's fixed collection
+    order, so two transactions can never deadlock. Changes are buffered and
+    applied together on exit, then written in a single commit; if the block
+    raises, nothing is applied, and if the write fails the changes are taken
+    back out of memory. Reads inside the block don't see the transaction's
+    own buffered changes.
+    """
+
+    def __init__(self, store, names):
+        self.store = store
+        self.names = sorted(set(names), key=store.backend.collections.index)
+        self.ops = []
+
+    def get(self, name):
+        return self.store.get(name)
+
+    def append(self, name, record):
+        self._check(name)
+        self.ops.append((name, 'append', record, None))
+        return record
+
+    def update(self, name, record_id, fields):
+        self._check(name)
+        self.ops.append((name, 'update', record_id, fields))
+
+    def _check(self, name):
+        if name not in self.names:
+            raise ValueError(f"Collection '{name}' is not part of this transaction")
+
+    async def __aenter__(self):
+        acquired = []
+        try:
+            for name in self.names:
+                await self.store._lock(name).acquire()
+                acquired.append(name)
+        except BaseException:
+            for name in acquired:
+                self.store._lock(name).release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None and self.ops:
+                await self.store._commit(self.ops)
+        finally:
+            for name in reversed(self.names):
+                self.store._lock(name).release()
+
+
+class DataStore:
+    """Process-wide in-memory copy of the marketplace data.
+
+    Every collection is read from the backend once; after that reads are
+    served from memory. Changes are applied to memory immediately and
+    marked dirty. Dirty collections are flushed to the backend by the
+    storage writer, off the event loop, at most `flush_window` seconds after
+    the first change or as soon as `flush_threshold` changes are queued, so
+    bursts of changes to the same collection share a single write. The
+    write methods return once their change is on disk.
+
+    List collections are indexed by ID, plus by any fields listed for them in
+    `indexes`. Indexes are kept current by the write methods, so records must
+    only be changed through them (or replaced wholesale with put()).
+
+    Listeners registered with subscribe() are told about every change as it
+    is applied to memory, which lets derived data stay current without
+    rescanning the collections.
+    """
+
+    # Seconds before a collection whose write failed is written out again
+    retry_delay = 5
+
+    def __init__(self, backend, max_pending_writes=100, flush_window=0.25, flush_threshold=50,
+                 indexes=None):
+        self.backend = backend
+        self.writer = StorageWriter(max_pending_writes)
+        self.flush_window = flush_window
+        self.flush_threshold = flush_threshold
+        self._data = {}
+        self.loaded = False
+        # Per collection: queued ops, futures waiting on them and the flush timer
+        self._dirty = {}
+        self._waiters = {}
+        self._timers = {}
+        self._locks = {}
+        # Writes of each collection queued or running on the writer
+        self._writing = {}
+        # Per collection: field -> value -> {id: record}, plus 'id' -> {id: record};
+        # built on first use
+        self.indexed_fields = indexes or {}
+        self._indexes = {}
+        self._listeners = []
+
+    def init_files(self):
+        """Create any missing storage with empty collections"""
+        self.backend.init()
+
+    def load(self):
+        """Read every collection from the backend into memory"""
+        for name in self.backend.collections:
+            self._data[name] = self.backend.load(name)
+        self._indexes.clear()
+        self._seed_sequences()
+        self.loaded = True
+        for name in self.backend.collections:
+            self._notify(name, 'load', None)
+
+    def _seed_sequences(self):
+        """Make sure no sequence is behind the highest ID already in use"""
+        sequences = self._data.setdefault('sequences', {})
+        for name, data in self._data.items():
+            if isinstance(data, list) and data:
+                highest = max(record['id'] for record in data)
+                if highest > sequences.get(name, 0):
+                    sequences[name] = highest
+
+    def next_id(self, name):
+        """Allocate a new ID for a record in a list collection.
+
+        IDs come from a persisted per-collection sequence, so they are never
+        reused, even after the record holding the highest ID is deleted. The
+        increment has no await in it, so concurrent coroutines can't get the
+        same ID. Persisting the sequence doesn't hold up the caller; after a
+        crash the sequence is re-seeded from the highest ID on disk.
+        """
+        sequences = self.get('sequences')
+        sequences[name] = sequences.get(name, 0) + 1
+        self._mark_dirty('sequences', 'save', None, wait=False)
+        return sequences[name]
+
+    def get(self, name):
+        """Return the in-memory data for a collection"""
+        if not self.loaded:
+            self.load()
+        elif name not in self._dirty and not self._writing.get(name) \
+                and self.backend.changed_on_disk(name):
+            # Somebody edited the data file by hand; pick up their changes
+            self._data[name] = self.backend.load(name)
+            self._indexes.pop(name, None)
+            self._seed_sequences()
+            self._notify(name, 'load', None)
+        return self._data[name]
+
+    def subscribe(self, listener):
+        """Call listener(name, event, record, old) after each in-memory change.
+
+        event is 'load' when the whole collection was (re)loaded or replaced
+        (record is None), otherwise 'append', 'update' or 'delete'. For
+        'update', old holds the previous values of the fields that changed.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, name, event, record, old=None):
+        for listener in self._listeners:
+            listener(name, event, record, old)
+
+    def by_id(self, name):
+        """Return the records of a list collection keyed by ID"""
+        return self._index(name)['id']
+
+    def find_by(self, name, field, value):
+        """Return the records of a list collection with the given field value"""
+        return list(self._index(name)[field].get(value, {}).values())
+
+    def count_by(self, name, field, value):
+        """Count the records of a list collection with the given field value"""
+        return len(self._index(name)[field].get(value, ()))
+
+    def _index(self, name):
+        """Return a collection's indexes, building them on first use.
+
+        The indexes hold the same dicts as the collection. They are dropped
+        whenever the whole collection is replaced or reloaded.
+        """
+        data = self.get(name)
+        indexes = self._indexes.get(name)
+        if indexes is None:
+            indexes = self._indexes[name] = {'id': {}}
+            for field in self.indexed_fields.get(name, ()):
+                indexes[field] = {}
+            for record in data:
+                _index_record(indexes, record)
+        return indexes
+
+    def _indexed_append(self, name, record):
+        self.get(name).append(record)
+        if name in self._indexes:
+            _index_record(self._indexes[name], record)
+        self._notify(name, 'append', record)
+
+    def _indexed_update(self, name, record, fields):
+        """Apply field changes to a record, moving it between index buckets"""
+        indexes = self._index(name)
+        for field, buckets in indexes.items():
+            if field != 'id' and field in fields and fields[field] != record.get(field):
+                _unindex_field(buckets, record, field)
+                buckets.setdefault(fields[field], {})[record['id']] = record
+        old = {field: record.get(field) for field, value in fields.items() if record.get(field) != value}
+        record.update(fields)
+        self._notify(name, 'update', record, old)
+
+    def _indexed_remove(self, name, record):
+        indexes = self._index(name)
+        indexes['id'].pop(record['id'], None)
+        for field, buckets in indexes.items():
+            if field != 'id':
+                _unindex_field(buckets, record, field)
+        data = self.get(name)
+        del data[next(i for i, r in enumerate(data) if r is record)]
+        self._notify(name, 'delete', record)
+
+    async def put(self, name, data):
+        """Replace a collection in memory and write it through"""
+        if not self.loaded:
+            self.load()
+        self._data[name] = data
+        self._indexes.pop(name, None)
+        self._notify(name, 'load', None)
+        await self._mark_dirty(name, 'save', None)
+
+    async def append(self, name, record):
+        """Add a new record to a list collection and write it through"""
+        self._indexed_append(name, record)
+        await self._mark_dirty(name, 'append', record)
+        return record
+
+    async def update(self, name, record_id, fields):
+        """Change fields of an existing record and write it through"""
+        record = self.by_id(name).get(record_id)
+        if record is None:
+            return None
+        self._indexed_update(name, record, fields)
+        await self._mark_dirty(name, 'update', record)
+        return record
+
+    async def delete(self, name, record_id):
+        """Remove a record from a list collection and write it through"""
+        record = self.by_id(name).get(record_id)
+        if record is None:
+            return None
+        self._indexed_remove(name, record)
+        await self._mark_dirty(name, 'save', None)
+        return record
+
+    async def link(self, name, pairs):
+        """Write through (key, value) pairs added to a dict-of-lists collection.
+
+        The caller has already added them in memory. Backends that keep such
+        a collection row by row insert just these rows; the others rewrite it.
+        """
+        await asyncio.gather(*(self._mark_dirty(name, 'link', pair) for pair in pairs))
+
+    async def unlink(self, name, pairs):
+        """Write through (key, value) pairs removed from a dict-of-lists collection"""
+        await asyncio.gather(*(self._mark_dirty(name, 'unlink', pair) for pair in pairs))
+
+    def touch(self, name):
+        """Queue a write of a collection that was changed in place.
+
+        Doesn't wait for the write. Outside the event loop (while loading at
+        startup) the collection just stays dirty until its next flush.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            _queue_op(self._dirty.setdefault(name, {}), 'save', None)
+            return
+        self._mark_dirty(name, 'save', None, wait=False)
+
+    def transaction(self, *names):
+        """Start a unit of work over the given collections"""
+        return Transaction(self, names)
+
+    def _lock(self, name):
+        if name not in self._locks:
+            self._locks[name] = asyncio.Lock()
+        return self._locks[name]
+
+    async def _commit(self, tx_ops):
+        """Apply a transaction's changes and write them in one job"""
+        touched = []
+        # How to take each change back out of memory if the write fails
+        undo = []
+        for name, op, value, fields in tx_ops:
+            if op == 'append':
+                self._indexed_append(name, value)
+                record = value
+                undo.append((name, record, None, None))
+            else:
+                record = self.by_id(name).get(value)
+                if record is None:
+                    continue
+                before = {field: record[field] for field in fields if field in record}
+                undo.append((name, record, before, [field for field in fields if field not in record]))
+                self._indexed_update(name, record, fields)
+            if name not in touched:
+                touched.append(name)
+            _queue_op(self._dirty.setdefault(name, {}), op, record)
+
+        # Anything already dirty in these collections goes out in the same job
+        batches = {}
+        waiters = []
+        for name in touched:
+            timer = self._timers.pop(name, None)
+            if timer is not None:
+                timer.cancel()
+            batches[name] = list(self._dirty.pop(name).values())
+            waiters.extend(self._waiters.pop(name, []))
+
+        try:
+            await self._write(batches, lambda: self.backend.prepare_commit([
+                self.backend.prepare_batch(name, ops, self._data[name])
+                for name, ops in batches.items()
+            ]))
+        except Exception as e:
+            self._undo(undo)
+            # Other changes that shared the job still need writing
+            self._retry(touched)
+            _resolve(waiters, e)
+            raise
+        _resolve(waiters, None)
+
+    def _undo(self, undo):
+        """Revert applied transaction changes, newest first"""
+        for name, record, before, missing in reversed(undo):
+            if before is None:
+                self._indexed_remove(name, record)
+            else:
+                self._indexed_update(name, record, dict(before, **dict.fromkeys(missing)))
+                for field in missing:
+                    record.pop(field, None)
+
+    def _retry(self, names):
+        """Write collections out in full after a failed write"""
+        loop = asyncio.get_running_loop()
+        for name in names:
+            _queue_op(self._dirty.setdefault(name, {}), 'save', None)
+            if name not in self._timers:
+                self._timers[name] = loop.call_later(
+                    self.retry_delay, lambda name=name: loop.create_task(self._flush(name)))
+
+    async def compact(self):
+        """Fold any backend journals into their snapshots"""
+        if not self.loaded:
+            return
+        await self.flush()
+        for name in self.backend.collections:
+            await self._write([name], lambda name=name: self.backend.prepare_compact(name, self._data[name]))
+
+    async def flush(self, name=None):
+        """Write out dirty collections right away"""
+        names = [name] if name else list(self._dirty)
+        await asyncio.gather(*(self._flush(n) for n in names))
+
+    async def close(self):
+        """Flush every dirty collection and finish all pending writes"""
+        await self.flush()
+        await self.writer.drain()
+
+    def _mark_dirty(self, name, op, record, wait=True):
+        """Queue an op for the next flush and return a future for it"""
+        ops = self._dirty.setdefault(name, {})
+        _queue_op(ops, op, record)
+
+        loop = asyncio.get_running_loop()
+        future = None
+        if wait:
+            future = loop.create_future()
+            self._waiters.setdefault(name, []).append(future)
+
+        if len(ops) >= self.flush_threshold:
+            loop.create_task(self._flush(name))
+        elif name not in self._timers:
+            self._timers[name] = loop.call_later(
+                self.flush_window, lambda: loop.create_task(self._flush(name)))
+        return future
+
+    async def _flush(self, name):
+        timer = self._timers.pop(name, None)
+        if timer is not None:
+            timer.cancel()
+        ops = list(self._dirty.pop(name, {}).values())
+        waiters = self._waiters.pop(name, [])
+        if not ops:
+            return
+
+        try:
+            await self._write([name], lambda: self.backend.prepare_batch(name, ops, self._data[name]))
+        except Exception as e:
+            # The changes are still in memory; keep trying to write them
+            self._retry([name])
+            _resolve(waiters, e)
+        else:
+            _resolve(waiters, None)
+
+    async def _write(self, names, prepare):
+        """Hand a job to the writer, tracking which collections it touches"""
+        for name in names:
+            self._writing[name] = self._writing.get(name, 0) + 1
+        try:
+            await self.writer.submit(prepare)
+        finally:
+            for name in names:
+                self._writing[name] -= 1
+
+
+def _index_record(indexes, record):
+    for field, buckets in indexes.items():
+        if field == 'id':
+            buckets[record['id']] = record
+        else:
+            buckets.setdefault(record.get(field), {})[record['id']] = record
+
+
+def _unindex_field(buckets, record, field):
+    bucket = buckets.get(record.get(field))
+    if bucket is not None:
+        bucket.pop(record['id'], None)
+        if not bucket:
+            del buckets[record.get(field)]
+
+
+def _queue_op(ops, op, record):
+    """Add an op to a collection's pending ops, dropping redundant ones"""
+    if op == 'save' or 'save' in ops:
+        # A full save already covers every other change
+        ops.clear()
+        ops['save'] = ('save', None)
+    elif op in ('link', 'unlink'):
+        # Only the last link or unlink of a pair matters
+        ops.pop(('link', record), None)
+        ops.pop(('unlink', record), None)
+        ops[(op, record)] = (op, record)
+    elif ('append', record['id']) not in ops:
+        # Ops are prepared at flush time from the current record, so an
+        # append already carries any later update of the same record
+        ops[(op, record['id'])] = (op, record)
+
+
+def _resolve(waiters, error):
+    """Wake up everyone waiting on a flush"""
+    for waiter in waiters:
+        if not waiter.done():
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
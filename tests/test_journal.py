@@ -0,0 +1,46 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from storage import DataStore, JournalBackend
+
+
+class JournalTornLineTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.files = {
+            'orders': (os.path.join(self.tmp.name, 'orders.json'), []),
+            'tickets': (os.path.join(self.tmp.name, 'tickets.json'), []),
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open_store(self):
+        backend = JournalBackend(self.files)
+        backend.init()
+        store = DataStore(backend, flush_window=0)
+        store.load()
+        return store
+
+    def test_append_after_torn_line_survives_reload(self):
+        async def write(ids):
+            store = self.open_store()
+            for order_id in ids:
+                await store.append('orders', {'id': order_id})
+            await store.close()
+
+        asyncio.run(write([1, 2, 3]))
+        # Crash in the middle of appending the next entry
+        with open(self.files['orders'][0] + '.journal', 'a') as f:
+            f.write('{"op":"app')
+
+        asyncio.run(write([4]))
+
+        store = self.open_store()
+        self.assertEqual([order['id'] for order in store.get('orders')], [1, 2, 3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
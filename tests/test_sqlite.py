@@ -0,0 +1,43 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from storage import DataStore, SqliteBackend
+
+
+class UserScriptsRowsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'marketplace.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_grants_are_written_row_by_row(self):
+        async def run():
+            backend = SqliteBackend(self.db_path)
+            backend.init()
+            store = DataStore(backend, flush_window=0)
+            store.load()
+            statements = []
+            backend.conn.set_trace_callback(statements.append)
+
+            user_scripts = store.get('user_scripts')
+            user_scripts['42'] = [1, 2]
+            await store.link('user_scripts', [('42', 1), ('42', 2)])
+            user_scripts['42'] = [2]
+            await store.unlink('user_scripts', [('42', 1)])
+            user_scripts['42'].append(1)
+            await store.unlink('user_scripts', [('42', 3)])
+            await store.link('user_scripts', [('42', 1)])
+            await store.close()
+
+            self.assertNotIn("DELETE FROM user_scripts", statements)
+            self.assertEqual(SqliteBackend(self.db_path).load('user_scripts'), {'42': [2, 1]})
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
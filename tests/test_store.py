@@ -0,0 +1,54 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from storage import DataStore, JsonBackend
+
+
+class FailedCommitTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.files = {
+            'orders': (os.path.join(self.tmp.name, 'orders.json'), []),
+            'tickets': (os.path.join(self.tmp.name, 'tickets.json'), []),
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_failed_transaction_is_taken_out_of_memory(self):
+        async def run():
+            backend = JsonBackend(self.files)
+            backend.init()
+            store = DataStore(backend, flush_window=0)
+            store.load()
+            await store.append('tickets', {'id': 1, 'status': 'pending'})
+
+            def prepare_commit(jobs):
+                def job():
+                    raise OSError("disk full")
+                return job
+            backend.prepare_commit = prepare_commit
+
+            # Not assertRaises: it clears the traceback's frames, which
+            # include the storage writer's suspended task
+            try:
+                async with store.transaction('orders', 'tickets') as tx:
+                    tx.append('orders', {'id': 1})
+                    tx.update('tickets', 1, {'status': 'verified', 'verified_at': 10})
+            except OSError:
+                pass
+            else:
+                self.fail("commit didn't raise")
+
+            self.assertEqual(store.get('orders'), [])
+            self.assertEqual(store.get('tickets'), [{'id': 1, 'status': 'pending'}])
+            self.assertEqual(store.by_id('orders'), {})
+            await store.close()
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()